@@ -43,10 +43,13 @@ lambdas = np.array([1, 25, 50, 75, 100], dtype=int) * 1000
 num_regions = 50
 
 
+# only the flat norms of the plotted lambdas are loaded
 flatnorm_df, fn_city_df, city_ratio = fx.read_stats(
     f"{fx.area}-FN_STAT_R{num_regions}-fixed_lambdas",
     f"{fx.area}-FN_STAT_city-fixed_lambdas",
-    in_dir="out/test"
+    in_dir="out/test",
+    columns=['flatnorms'],
+    filters=[('lambdas', 'in', lambdas.tolist())],
 )
 
 L = len(lambdas)
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 10:12:31 2026
+
+Author: Rounak Meyur
+
+Description: Compares the bulk boundary matrix builder against the entry by
+entry reference implementation on the triangulation of a whole area.
+"""
+
+import sys, os
+from timeit import default_timer as timer
+from datetime import timedelta
+
+workpath = os.getcwd()
+sys.path.append(workpath+'/libs/')
+
+from libs.pyFlatNormFixture import FlatNormFixture
+from libs.pyFlatNormlib import perform_triangulation
+from libs.pyUtilslib import boundary_matrix, boundary_matrix_dok
+
+
+# get fixture
+fx = FlatNormFixture('runTest')
+area = 'mcbryde'
+
+# triangulate the whole area
+act_geom, synt_geom, hull = fx.read_networks(area)
+D = perform_triangulation(
+    fx.sort_geometry(act_geom), fx.sort_geometry(synt_geom),
+    adj=1000, opts="ps")
+triangles = D['triangulated']['triangles']
+edges = D['triangulated']['edges']
+print(f"{area} : {len(triangles)} triangles : {len(edges)} edges")
+
+# time both builders
+start = timer()
+b_fast = boundary_matrix(triangles, edges, format='coo')
+end = timer()
+t_fast = end - start
+
+start = timer()
+b_dok = boundary_matrix_dok(triangles, edges, format='coo')
+end = timer()
+t_dok = end - start
+
+num_diff = (b_fast.tocsr() != b_dok.tocsr()).nnz
+print("--------------------------------------------------------------------------")
+print(f"boundary_matrix     : {timedelta(seconds=t_fast)}")
+print(f"boundary_matrix_dok : {timedelta(seconds=t_dok)}")
+print(f"speedup = {t_dok / t_fast:0.1f}x : mismatched entries = {num_diff}")
+print("--------------------------------------------------------------------------")
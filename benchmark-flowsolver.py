@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 15:41:09 2026
+
+Author: Rounak Meyur
+
+Description: Compares the minimum cost flow solvers of the multiscale flat norm
+on the dual graph against the LP on sampled regions and on the whole area.
+"""
+
+import sys, os
+import numpy as np
+import pandas as pd
+from timeit import default_timer as timer
+from datetime import timedelta
+
+workpath = os.getcwd()
+sys.path.append(workpath+'/libs/')
+
+from libs.pyFlatNormFixture import FlatNormFixture
+from libs.pyFlatNormlib import msfn, msfn_flow
+from libs.pyFlowsolverlib import FLOW_SOLVERS
+
+
+# get fixture
+fx = FlatNormFixture('runTest')
+area = 'mcbryde'
+
+# parameters
+num_regions = 20
+epsilon = 2e-3
+lambda_ = 1000
+
+# sample regions and add the whole area as the last one
+act_geom, synt_geom, hull = fx.read_networks(area)
+region_list = fx.sample_regions_geom(
+    hull, act_geom, synt_geom,
+    num_regions=num_regions, epsilon=epsilon,
+    regions_only=True, seed=12345)
+region_list.append(hull)
+
+solvers = {'lp': lambda *args: msfn(*args, k=np.pi / 180.0, backend='highs')}
+for method in FLOW_SOLVERS:
+    solvers[f'flow-{method}'] = lambda *args, method=method: msfn_flow(
+        *args, k=np.pi / 180.0, method=method)
+
+benchmark_data = {'region': [], 'triangles': [], 'solver': [],
+                  'time': [], 'flatnorms': []}
+for r, region in enumerate(region_list):
+    D, T1, T2 = fx.get_triangulated_currents(region, act_geom, synt_geom)
+    if not D:
+        continue
+    for solver in solvers:
+        start = timer()
+        _, _, norm, _, _, _ = solvers[solver](
+            D['triangulated']['vertices'], D['triangulated']['triangles'],
+            D['triangulated']['edges'], T1 - T2, lambda_)
+        end = timer()
+        benchmark_data['region'].append('city' if r == num_regions else r)
+        benchmark_data['triangles'].append(len(D['triangulated']['triangles']))
+        benchmark_data['solver'].append(solver)
+        benchmark_data['time'].append(end - start)
+        benchmark_data['flatnorms'].append(norm)
+
+df = pd.DataFrame(benchmark_data)
+df['scope'] = np.where(df['region'] == 'city', 'city', 'regions')
+norms = df.pivot(index='region', columns='solver', values='flatnorms')
+times = df.groupby(['scope', 'solver'])['time'].sum()
+rel_diff = norms.sub(norms['lp'], axis=0).abs().div(norms['lp'].abs(), axis=0)
+
+print("--------------------------------------------------------------------------")
+for solver in solvers:
+    print(f"{solver:>15s} : regions time = {timedelta(seconds=times[('regions', solver)])} : "
+          f"city time = {timedelta(seconds=times[('city', solver)])} : "
+          f"max relative difference to lp = {rel_diff[solver].max():0.3g}")
+print("--------------------------------------------------------------------------")
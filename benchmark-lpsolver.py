@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 11:02:47 2026
+
+Author: Rounak Meyur
+
+Description: Compares the wall time and the optimal objective of the LP solver
+backends and LP formulations used for the multiscale flat norm on sampled
+regions of an area.
+"""
+
+import sys, os
+import numpy as np
+import pandas as pd
+from timeit import default_timer as timer
+from datetime import timedelta
+
+workpath = os.getcwd()
+sys.path.append(workpath+'/libs/')
+
+from libs.pyFlatNormFixture import FlatNormFixture
+from libs.pyFlatNormlib import msfn
+from libs.pyLPsolverlib import LP_SOLVERS
+
+
+# get fixture
+fx = FlatNormFixture('runTest')
+area = 'mcbryde'
+
+# parameters
+num_regions = 20
+epsilon = 2e-3
+lambda_ = 1000
+
+# sample regions
+act_geom, synt_geom, hull = fx.read_networks(area)
+region_list = fx.sample_regions_geom(
+    hull, act_geom, synt_geom,
+    num_regions=num_regions, epsilon=epsilon,
+    regions_only=True, seed=12345)
+
+formulations = ['split', 'reduced']
+benchmark_data = {'region': [], 'triangles': [], 'backend': [],
+                  'formulation': [], 'time': [], 'flatnorms': []}
+for r, region in enumerate(region_list):
+    D, T1, T2 = fx.get_triangulated_currents(region, act_geom, synt_geom)
+    if not D:
+        continue
+    for backend in LP_SOLVERS:
+        for formulation in formulations:
+            start = timer()
+            _, _, norm, _, _, _ = msfn(
+                D['triangulated']['vertices'], D['triangulated']['triangles'],
+                D['triangulated']['edges'], T1 - T2, lambda_,
+                k=np.pi / 180.0, backend=backend, formulation=formulation)
+            end = timer()
+            benchmark_data['region'].append(r)
+            benchmark_data['triangles'].append(len(D['triangulated']['triangles']))
+            benchmark_data['backend'].append(backend)
+            benchmark_data['formulation'].append(formulation)
+            benchmark_data['time'].append(end - start)
+            benchmark_data['flatnorms'].append(norm)
+
+df = pd.DataFrame(benchmark_data)
+norms = df.pivot(index='region', columns=['backend', 'formulation'], values='flatnorms')
+times = df.groupby(['backend', 'formulation'])['time'].sum()
+ref = norms[('glpk', 'split')]
+rel_diff = norms.sub(ref, axis=0).abs().div(ref.abs(), axis=0)
+
+print("--------------------------------------------------------------------------")
+for backend in LP_SOLVERS:
+    for formulation in formulations:
+        print(f"{backend:>6s} {formulation:>8s} : "
+              f"total time = {timedelta(seconds=times[(backend, formulation)])} : "
+              f"max relative objective difference to glpk split = "
+              f"{rel_diff[(backend, formulation)].max():0.3g}")
+print("--------------------------------------------------------------------------")
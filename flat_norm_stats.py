@@ -1,6 +1,6 @@
 import sys, os
+import csv
 import numpy as np
-import pandas as pd
 from shapely.geometry import Point, LineString, MultiLineString, base as sg
 from matplotlib import pyplot as plt, axes
 from timeit import default_timer as timer
@@ -8,7 +8,11 @@ from datetime import timedelta
 from pprint import pprint
 
 
-from flat_norm_fixture import FlatNormFixture
+workpath = os.getcwd()
+sys.path.append(workpath+'/libs/')
+
+from libs.pyFlatNormFixture import FlatNormFixture
+from libs.pyResultSinklib import ResultSink
 if __name__ == '__main__':
     # get fixture
     fx = FlatNormFixture('runTest')
@@ -20,56 +24,57 @@ if __name__ == '__main__':
     area = 'mcbryde'
     epsilons, lambdas = np.linspace(5e-4, 2e-3, 4), np.linspace(1000, 100000, 5)
     num_regions = 50
+    file_format = 'csv'     # 'parquet' writes a dataset partitioned by area, epsilon and lambda
+    projection = None       # 'laea' measures in meters, the lambdas are then per meter
+    fx.projection = projection
 
     # read geometries
     act_geom, synt_geom, hull = fx.read_networks(area)
 
-    # compute stats
-    flatnorm_data = {
-        'epsilons': [], 'lambdas': [], 'flatnorms': [],
-        'norm_lengths': [], 'norm_areas': [],
-        'input_lengths': [], 'input_ratios': [],
-    }
+    # results are appended as regions finish, a restarted run skips them
+    file_name = f"{area}-flatnorm-stats_{num_regions}_regions"
+    sink = ResultSink(
+        f"{fx.out_dir}/{file_name}.{file_format}",
+        key_columns=['area', 'epsilons', 'lambdas', 'region'],
+        partition_cols=['area', 'epsilons', 'lambdas'] if file_format == 'parquet' else None,
+        columns=['area', 'region', 'epsilons', 'lambdas', 'flatnorms',
+                 'norm_lengths', 'norm_areas', 'input_lengths', 'input_ratios'],
+        params={'area': area, 'seed': fx.seed, 'num_regions': num_regions,
+                'epsilons': epsilons.tolist(), 'lambdas': lambdas.tolist(),
+                'projection': projection},
+        quoting=csv.QUOTE_NONNUMERIC)
 
     np.random.seed(fx.seed)
     start_global = timer()
     for e, epsilon in enumerate(epsilons, start=1):
-        for l, lambda_ in enumerate(lambdas, start=1):
-            print(f"### EPS[{e}] = {epsilon:0.5f} ###### LAMBDA[{l}] = {lambda_:0.5f} ###")
+        print(f"### EPS[{e}] = {epsilon:0.5f} ###")
 
-            # sample points
-            points = fx.random_points_geom(
-                hull, act_geom, synt_geom,
-                epsilon=epsilons[0],
-                num_points=num_regions,
-            )
+        # sample points
+        points = fx.random_points_geom(
+            hull, act_geom, synt_geom,
+            epsilon=epsilons[0],
+            num_points=num_regions,
+        )
 
-            # compute flat norm
-            start = timer()
-            for pt in points:
-                norm, enorm, tnorm, w = fx.compute_region_flatnorm(
-                    fx.get_region(pt, epsilon),
-                    act_geom, synt_geom,
-                    lambda_=lambda_,
-                    normalized=True,
-                    plot=False
-                )
-                flatnorm_data['epsilons'].append(f"{epsilon:0.4f}")
-                flatnorm_data['lambdas'].append(lambda_)
-                flatnorm_data['flatnorms'].append(norm)
-                flatnorm_data['norm_lengths'].append(enorm)
-                flatnorm_data['norm_areas'].append(tnorm)
-                flatnorm_data['input_lengths'].append(w)
-                flatnorm_data['input_ratios'].append(w/epsilon)
-                pass
+        # compute flat norm for all lambdas on each triangulated region
+        start = timer()
+        regions = [fx.get_region(pt, epsilon) for pt in points]
+        fx.compute_regions_parallel(
+            regions, act_geom, synt_geom,
+            lambdas=lambdas,
+            epsilons=[epsilon] * len(regions),
+            normalized=True,
+            sink=sink, tags={'area': area, 'epsilons': f"{epsilon:0.4f}"},
+        )
 
-            end = timer()
-            print(f">>> EPS[{e}] : LAMBDA[{l}] >>> {timedelta(seconds=end - start)} \n")
+        end = timer()
+        print(f">>> EPS[{e}] : {len(lambdas)} LAMBDAS >>> {timedelta(seconds=end - start)} \n")
 
 
     end_global = timer()
 
-    flatnorm_data = pd.DataFrame(flatnorm_data)
+    sink.close()
+    flatnorm_data = sink.read()
 
     print("--------------------------------------------------------------------------")
     print(
@@ -79,8 +84,3 @@ if __name__ == '__main__':
     print("--------------------------------------------------------------------------")
     pprint(flatnorm_data)
 
-
-    file_name = f"{area}-flatnorm-stats_{num_regions}_regions"
-    import csv
-    with open(f"{fx.out_dir}/{file_name}.csv", "w") as outfile:
-        flatnorm_data.to_csv(outfile, sep=",", index=False, header=True, quoting=csv.QUOTE_NONNUMERIC)
@@ -22,7 +22,7 @@ MIN_X, MIN_Y, MAX_X, MAX_Y = 0, 1, 2, 3
 workpath = os.getcwd()
 sys.path.append(workpath+'/libs/')
 
-from libs.pyFlatNormFixture import FlatNormFixture
+from libs.pyFlatNormFixture import FlatNormFixture, input_ratio
 from libs.pyFlatNormlib import get_structure
 
 
@@ -80,7 +80,7 @@ for ind in ind_label:
     # store the data
     flatnorm_data['index'].append(ind)
     flatnorm_data['flatnorms'].append(norm)
-    flatnorm_data['input_ratios'].append(w/epsilon)
+    flatnorm_data['input_ratios'].append(input_ratio(w, epsilon, fx.projection))
     flatnorm_data['hausdorff'].append(hd)
     region_bounds = region.exterior.bounds
     flatnorm_data['MIN_X'].append(region_bounds[MIN_X])
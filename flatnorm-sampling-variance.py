@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 18:20:31 2026
+
+Author: Rounak Meyur
+
+Description: Compares the variance of the area mean of the normalized flat norm
+estimated with the region sampling strategies of the fixture, and the number
+of LP solves each strategy needs for the confidence interval of uniform
+sampling.
+"""
+
+import sys, os
+from timeit import default_timer as timer
+from datetime import timedelta
+
+workpath = os.getcwd()
+sys.path.append(workpath+'/libs/')
+
+from libs.pyFlatNormFixture import FlatNormFixture, SAMPLING_STRATEGIES
+
+
+if __name__ == '__main__':
+    # get fixture
+    fx = FlatNormFixture('runTest')
+    fx.out_dir = "out/script"
+    area = 'mcbryde'
+
+    # parameters
+    num_regions = 20
+    repeats = 10
+    epsilon = 2e-3
+    lambda_ = 1000
+
+    act_geom, synt_geom, hull = fx.read_networks(area)
+
+    start = timer()
+    report, runs = fx.compare_sampling_strategies(
+        hull, act_geom, synt_geom,
+        strategies=SAMPLING_STRATEGIES,
+        num_regions=num_regions, repeats=repeats,
+        epsilon=epsilon, lambda_=lambda_, seed=12345)
+    end = timer()
+
+    print("--------------------------------------------------------------------------")
+    print(f"{len(SAMPLING_STRATEGIES)} strategies x {repeats} samples x {num_regions} regions "
+          f"= {timedelta(seconds=end - start)}")
+    print("--------------------------------------------------------------------------")
+    print(report.to_string(index=False))
+
+    file_name = f"{area}-sampling-variance_{num_regions}_regions"
+    report.to_csv(f"{fx.out_dir}/{file_name}.csv", index=False)
+    runs.to_csv(f"{fx.out_dir}/{file_name}_runs.csv", index=False)
@@ -10,9 +10,8 @@ aspect of metric stability.
 """
 
 import sys, os
-import numpy as np
-from shapely.geometry import Point, LineString
-import pandas as pd
+from shapely.geometry import Point
+import csv
 
 
 FN = FLAT_NORM = "\\mathbb{{F}}_{{\\lambda}}"
@@ -25,6 +24,8 @@ sys.path.append(workpath+'/libs/')
 
 from libs.pyFlatNormFixture import FlatNormFixture
 from libs.pyFlatNormlib import get_structure
+from libs.pyResultSinklib import ResultSink
+from libs.pyPerturblib import PerturbationEnsemble
 
 
 # get fixture
@@ -47,36 +48,6 @@ ind_label = {
 
 
 
-#%% Perturbations
-
-def get_perturbed_verts(vertices, radius):
-    n = vertices.shape[0]
-    # Get the deviation radius in degrees
-    R = 6378100
-    phi = (180/np.pi) * (radius/R)
-    
-    # Sample vertices from the radius of existing vertices
-    r = phi * np.sqrt(np.random.uniform(size=(n,)))
-    theta = np.random.uniform(size=(n,)) * 2 * np.pi
-    dx = r * np.cos(theta)
-    dy = r * np.sin(theta)
-    return vertices + np.vstack((dx,dy)).T
-
-def variant_geometry(geometry, radius=10, N=1):
-    # Get the vertices and line segments
-    struct = get_structure(geometry)
-    
-    # Get the new networks
-    new_geom = []
-    for i in range(N):
-        # Get perturbed vertices
-        new_verts = get_perturbed_verts(struct["vertices"], radius)
-    
-        # get the updated geometries
-        new_geom.append([LineString((Point(new_verts[i]), Point(new_verts[j]))) \
-                    for i,j in struct["segments"]])
-    return new_geom
-
 #%% compute flat norm
 act_geom, synth_geom, hull = fx.read_networks(area)
 struct = get_structure(act_geom)
@@ -86,54 +57,40 @@ num_networks = 1000
 radius_list = [10,20,30,40,50]
 epsilon = 1e-3
 lambda_ = 1e-3
+seed = 123
 
 
-# compute stats
-flatnorm_stability_data = {
-    'radius':[], 'flatnorms': [], 'input_ratios': [], 'index': [], 'hausdorff': [],
-    'MIN_X': [], 'MIN_Y': [], 'MAX_X': [], 'MAX_Y': []
-}
-
-# Construct perturbed synthetic network
+# results are appended as networks finish, a restarted run skips them
+file_name = f"{area}-L{lambda_}_FN_STABILITY_STAT_N{num_networks}_R{len(radius_list)}"
+sink = ResultSink(
+    f"{fx.out_dir}/{file_name}.csv",
+    key_columns=['area', 'radius', 'index', 'variant', 'lambdas'],
+    columns=['area', 'radius', 'index', 'variant', 'lambdas', 'flatnorms', 'input_ratios',
+             'hausdorff', 'MIN_X', 'MIN_Y', 'MAX_X', 'MAX_Y'],
+    params={'area': area, 'num_networks': num_networks, 'radius_list': radius_list,
+            'epsilon': epsilon, 'lambda': lambda_, 'index': list(ind_label), 'seed': seed},
+    quoting=csv.QUOTE_NONNUMERIC)
+
+# Perturbed synthetic networks, every vertex is displaced within the radius,
+# the variants are generated by the workers from their seeds
 for rad in radius_list:
-    sgeom_list = variant_geometry(synth_geom, radius=rad, N=num_networks)
-    # compute flat norm and append to statistics dictionary
+    ensemble = PerturbationEnsemble(synth_geom, num_networks, radius=rad, seed=[seed, rad])
+
+    # compute local flat norm and hausdorff distance for perturbed networks
+    # in all regions, the rows are ordered by region and then by network
     for ind in ind_label:
-        point = Point(struct["vertices"][ind])
-        region = fx.get_region(point, epsilon)
-        
-        # Compute local flat norm for perturbed networks
-        for syn_geom in sgeom_list:
-            norm, enorm, tnorm, w = fx.compute_region_flatnorm(
-                region,
-                act_geom, syn_geom,
-                lambda_=lambda_,
-                normalized=True,
-                plot=False
-            )
-
-            # compute hausdorff distance
-            hd, _ = fx.compute_region_hausdorff(
-                fx.get_region(point, epsilon),
-                act_geom, syn_geom,
-                distance = "geodesic",
-                )
-            
-            # Update statistics
-            flatnorm_stability_data['radius'].append(rad)
-            flatnorm_stability_data['index'].append(ind)
-            flatnorm_stability_data['flatnorms'].append(norm)
-            flatnorm_stability_data['input_ratios'].append(w/epsilon)
-            flatnorm_stability_data['hausdorff'].append(hd)
-            region_bounds = region.exterior.bounds
-            flatnorm_stability_data['MIN_X'].append(region_bounds[MIN_X])
-            flatnorm_stability_data['MIN_Y'].append(region_bounds[MIN_Y])
-            flatnorm_stability_data['MAX_X'].append(region_bounds[MAX_X])
-            flatnorm_stability_data['MAX_Y'].append(region_bounds[MAX_Y])
-
-
-
-df_stability = pd.DataFrame(flatnorm_stability_data)
+        region = fx.get_region(Point(struct["vertices"][ind]), epsilon)
+        fx.compute_regions_parallel(
+            [region], act_geom, ensemble,
+            lambdas=[lambda_],
+            epsilons=[epsilon],
+            normalized=True,
+            distance="geodesic",
+            sink=sink, tags={'area': area, 'radius': rad, 'index': ind},
+        )
+
+sink.close()
+df_stability = sink.read()
 
 print("--------------------------------------------------------------------------")
 print(
@@ -142,10 +99,3 @@ print(
     )
 print("--------------------------------------------------------------------------")
 
-
-
-file_name = f"{area}-L{lambda_}_FN_STABILITY_STAT_N{num_networks}_R{len(radius_list)}"
-import csv
-with open(f"{fx.out_dir}/{file_name}.csv", "w") as outfile:
-    df_stability.to_csv(outfile, sep=",", index=False, header=True, quoting=csv.QUOTE_NONNUMERIC)
-
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 19:02:14 2026
+
+Author: Rounak Meyur
+
+Description: Content addressed cache of triangulated regions. The key of a
+region is a hash of the coordinates of the clipped and sorted input segments
+and of the triangulation options, so the same input met again through another
+multiscale factor, stability radius or plotting pass reuses the triangulation
+and the currents instead of calling Triangle again.
+"""
+
+import os
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+import shapely
+
+
+def geometry_fingerprint(act_geom, synt_geom, **params):
+    '''
+    Hash of the input segments of a triangulation.
+    :param act_geom, synt_geom: lists of the clipped actual and synthetic
+        network geometries.
+    :param params: options of the triangulation, such as adj and opts.
+    :returns: hexadecimal digest.
+    '''
+    digest = hashlib.sha1()
+    for geometry in (act_geom, synt_geom):
+        coords, index = shapely.get_coordinates(geometry, return_index=True)
+        digest.update(np.int64(len(geometry)).tobytes())
+        digest.update(np.ascontiguousarray(coords, dtype=np.float64).tobytes())
+        digest.update(np.ascontiguousarray(index, dtype=np.int64).tobytes())
+    digest.update(repr(sorted(params.items())).encode())
+    return digest.hexdigest()
+
+def flatten_triangulation(D, T1, T2):
+    '''
+    Arrays of a triangulated region for an .npz file. The input geometries
+    are not stored, they are the segments of the triangulated vertices.
+    '''
+    arrays = {f"{part}/{name}": np.asarray(value)
+              for part in ('intermediate', 'triangulated')
+              for name, value in D[part].items()}
+    arrays['actual_segments'] = D['actual_segments']
+    arrays['synthetic_segments'] = D['synthetic_segments']
+    arrays['T1'] = T1
+    arrays['T2'] = T2
+    return arrays
+
+def unflatten_triangulation(arrays):
+    '''
+    Rebuilds the output of flatten_triangulation.
+    '''
+    D = {'intermediate': {}, 'triangulated': {}}
+    for name in arrays.files:
+        if '/' in name:
+            part, key = name.split('/', 1)
+            D[part][key] = arrays[name]
+    vertices = D['triangulated']['vertices']
+    for network in ('actual', 'synthetic'):
+        pairs = arrays[f"{network}_segments"]
+        D[f"{network}_segments"] = pairs
+        D[network] = list(shapely.linestrings(vertices[pairs])) if len(pairs) else []
+    return D, arrays['T1'], arrays['T2']
+
+
+class TriangulationCache:
+    """
+    Least recently used cache of the triangulation D and the currents T1, T2
+    of regions, optionally backed by .npz files in a directory. The cached
+    objects are shared between the calls and must not be modified.
+    """
+    def __init__(self, maxsize=64, cache_dir=None):
+        '''
+        :param int maxsize: number of regions kept in memory, 0 disables the
+            memory cache.
+        :param str cache_dir: directory of the .npz files, None to keep the
+            cache in memory only.
+        '''
+        self.maxsize = maxsize
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        return
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def get(self, key):
+        '''
+        Cached triangulation of a key, from memory or else from disk.
+        :returns: (D, T1, T2) or None on a miss.
+        '''
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        if self.cache_dir and os.path.exists(self.path(key)):
+            with np.load(self.path(key)) as arrays:
+                value = unflatten_triangulation(arrays)
+            self.disk_hits += 1
+            self._remember(key, value)
+            return value
+        self.misses += 1
+        return None
+
+    def put(self, key, D, T1, T2):
+        '''
+        Stores a triangulation in memory and on disk if a directory is set.
+        '''
+        value = (D, T1, T2)
+        self._remember(key, value)
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # written under a temporary name so that parallel workers never
+            # read a partial file
+            temp = f"{self.path(key)}.{os.getpid()}.tmp"
+            with open(temp, 'wb') as f:
+                np.savez(f, **flatten_triangulation(D, T1, T2))
+            os.replace(temp, self.path(key))
+        return value
+
+    def _remember(self, key, value):
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return
+
+    def clear(self):
+        '''
+        Empties the memory cache and resets the counts, the files are kept.
+        '''
+        self._entries.clear()
+        self.hits = self.disk_hits = self.misses = 0
+        return
+
+    def stats(self):
+        '''
+        :returns: dictionary of the hit, disk hit and miss counts, the hit
+            rate and the number of regions in memory.
+        '''
+        lookups = self.hits + self.disk_hits + self.misses
+        return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                'size': len(self._entries)}
@@ -16,6 +16,8 @@ from matplotlib.collections import PolyCollection
 from matplotlib.patches import Patch
 from matplotlib.lines import Line2D
 
+from libs.pyGeometrylib import get_structure
+
 
 # %% Plot the spatial distribution
 def get_polygon(boundary):
@@ -130,23 +132,6 @@ def draw_polygons(ax, polygons, color='red', alpha=1.0, label=None):
     return ax
 
 
-def get_structure(geometry):
-    vertices = []
-    for geom in geometry:
-        geom_vertices = [Point(c) for c in geom.coords]
-        for c in geom_vertices:
-            if c not in vertices:
-                vertices.append(c)
-    segments = []
-    for geom in geometry:
-        ind1 = vertices.index(Point(geom.coords[0]))
-        ind2 = vertices.index(Point(geom.coords[1]))
-        segments.append((ind1, ind2))
-    struct = {'vertices': np.array([v.coords[0] for v in vertices]),
-              'segments': np.array(segments)}
-    return struct
-
-
 def get_vertseg_geometry(struct):
     if isinstance(struct, list):
         struct = get_structure(struct)
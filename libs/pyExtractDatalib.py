@@ -15,7 +15,7 @@ import geopandas as gpd
 import networkx as nx
 from networkx.utils import open_file
 from shapely.geometry import Point
-from libs.pyGeometrylib import Link
+from libs.pyGeodesiclib import geodesic_length
 import pickle
 
 @open_file(0, mode='rb')
@@ -94,12 +94,11 @@ def get_geometry(path,area):
     act_graph = nx.Graph()
     act_graph.add_edges_from(edgelist)
     
-    # Compute edge lengths
+    # Compute edge lengths of the whole network at once
+    lengths = geodesic_length(list(df_lines['geometry']))
     geo_length = {}
-    for e in edgelist:
-        edge = str(e[0])+'_'+str(e[1])
-        edge_geom = df_lines.loc[df_lines.ID == edge]['geometry'].values[0]
-        geo_length[e] = Link(edge_geom).geod_length
+    for e, length in zip(edgelist, lengths):
+        geo_length.setdefault(e, length)
     nx.set_edge_attributes(act_graph,geo_length,'geo_length')
 
     # Get coordinate limits
@@ -13,24 +13,35 @@ from pprint import pprint
 import warnings
 
 import sys, os
+import glob
 import numpy as np
 import math
+import multiprocessing
+from scipy.stats import qmc
 
 import geopandas as gpd
+import shapely
 from shapely.geometry import Point, LineString, MultiLineString
+from shapely import STRtree
 import shapely.geometry as sg
 from matplotlib import pyplot as plt
 import matplotlib.axes
-import networkx as nx
 import pandas as pd
 import seaborn as sns
 from sklearn.metrics import r2_score
 
 from libs.pyExtractDatalib import GetDistNet
-from libs.pyFlatNormlib import get_geometry, get_current, msfn, perform_triangulation
+from libs.pyFlatNormlib import get_line_segments, get_currents, get_frame, msfn, msfn_flow, msfn_sweep, perform_triangulation
 from libs.pyDrawNetworklib import plot_norm, plot_intermediate_result, plot_input, plot_failed_triangulation
 from libs.pyDrawNetworklib import plot_regions, plot_triangulation
-from libs.pyHausdorfflib import compute_hausdorff, compute_length
+from libs.pyHausdorfflib import compute_hausdorff, densify, select_points, prepare_points, hausdorff_prepared
+from libs.pyUtilslib import simpvol
+from libs.pyGeometrylib import partitions
+from libs.pyGeodesiclib import MEAN_RADIUS
+from libs.pyCachelib import TriangulationCache, geometry_fingerprint
+from libs.pyResultSinklib import read_results
+from libs.pyNetworkStorelib import write_network_store, read_network_store, is_store_current, structure_to_geometry
+from libs.pyPerturblib import PerturbationEnsemble
 
 
 MIN_X, MIN_Y, MAX_X, MAX_Y = 0, 1, 2, 3
@@ -86,12 +97,273 @@ def timeit(f, *args, **kwargs):
     return outs, end - start
 
 
+def get_rng_state(rng):
+    '''
+    State of a numpy Generator, RandomState or of the numpy.random module.
+    '''
+    if isinstance(rng, np.random.Generator):
+        return rng.bit_generator.state
+    return rng.get_state()
+
+def set_rng_state(rng, state):
+    if isinstance(rng, np.random.Generator):
+        rng.bit_generator.state = state
+    else:
+        rng.set_state(state)
+    return
+
+def sample_uniform_points(bounds, accept, num_points, rng=None, block_size=None):
+    '''
+    Rejection sampling of points uniformly distributed in a bounding box.
+    Candidates are drawn in blocks and tested together. The coordinates of a
+    block are drawn in the same (x, y) order as one point at a time, and after
+    the last accepted candidate the generator is rewound to it, so the points
+    and the generator state match the sequential sampler for the same seed.
+    :param bounds: (min_x, min_y, max_x, max_y) of the box.
+    :param accept: function of the coordinate arrays (x, y) returning a
+        boolean array of accepted candidates.
+    :param num_points: number of points to return.
+    :param rng: numpy Generator or RandomState, defaults to numpy.random.
+    :param block_size: number of candidates per block, adapted to the
+        acceptance rate of the previous block by default.
+    :returns: x, y -- coordinate arrays of the points.
+    '''
+    if rng is None:
+        rng = np.random
+    min_x, min_y, max_x, max_y = bounds
+    xs, ys = [], []
+    count = 0
+    size = block_size or max(64, 2 * num_points)
+    while count < num_points:
+        state = get_rng_state(rng)
+        u = rng.random(2 * size)
+        x = min_x + (max_x - min_x) * u[0::2]
+        y = min_y + (max_y - min_y) * u[1::2]
+        accepted = np.flatnonzero(accept(x, y))
+
+        need = num_points - count
+        if len(accepted) >= need:
+            accepted = accepted[:need]
+            set_rng_state(rng, state)
+            rng.random(2 * (accepted[-1] + 1))
+        xs.append(x[accepted])
+        ys.append(y[accepted])
+        count += len(accepted)
+        if not block_size:
+            size = min(1 << 20, max(64, int(2 * need * size / max(len(accepted), 1))))
+    return np.concatenate(xs), np.concatenate(ys)
+
+def square_regions(x, y, epsilon):
+    '''
+    Squares of half width epsilon around the points, as Point.buffer with a
+    square cap style.
+    '''
+    return shapely.box(x - epsilon, y - epsilon, x + epsilon, y + epsilon)
+
+SAMPLING_STRATEGIES = ('uniform', 'stratified', 'sobol', 'halton', 'length')
+
+def network_segments(geometry):
+    '''
+    Straight segments of the line geometries of a network.
+    :returns: start, end -- arrays of the end points of the segments.
+    '''
+    coords, index = shapely.get_coordinates(geometry, return_index=True)
+    same = index[1:] == index[:-1]
+    return coords[:-1][same], coords[1:][same]
+
+def sample_qmc_points(bounds, accept, num_points, method='sobol', rng=None):
+    '''
+    Rejection sampling of scrambled low discrepancy points in a bounding box.
+    The candidates are taken in the order of the sequence, and the number of
+    points drawn is kept at powers of two, which preserves the balance of the
+    Sobol sequence.
+    :param bounds: (min_x, min_y, max_x, max_y) of the box.
+    :param accept: function of the coordinate arrays (x, y) returning a
+        boolean array of accepted candidates.
+    :param num_points: number of points to return.
+    :param method: 'sobol' or 'halton'.
+    :param rng: numpy Generator or RandomState seeding the scrambling,
+        defaults to numpy.random.
+    :returns: x, y -- coordinate arrays of the points.
+    '''
+    if rng is None:
+        rng = np.random
+    if isinstance(rng, np.random.Generator):
+        seed = int(rng.integers(2**31 - 1))
+    else:
+        seed = int(rng.randint(2**31 - 1))
+    if method == 'sobol':
+        engine = qmc.Sobol(d=2, scramble=True, seed=seed)
+    elif method == 'halton':
+        engine = qmc.Halton(d=2, scramble=True, seed=seed)
+    else:
+        raise ValueError(f"Unknown low discrepancy sequence {method}! Choose from ['sobol', 'halton']")
+
+    min_x, min_y, max_x, max_y = bounds
+    xs, ys = [], []
+    count = 0
+    size = 1 << int(np.ceil(np.log2(max(64, 2 * num_points))))
+    while count < num_points:
+        u = engine.random(size)
+        x = min_x + (max_x - min_x) * u[:, 0]
+        y = min_y + (max_y - min_y) * u[:, 1]
+        accepted = np.flatnonzero(accept(x, y))[:num_points - count]
+        xs.append(x[accepted])
+        ys.append(y[accepted])
+        count += len(accepted)
+        size = engine.num_generated
+    return np.concatenate(xs), np.concatenate(ys)
+
+def allocate_samples(sizes, num_points):
+    '''
+    Proportional allocation of points to strata by largest remainders, with
+    at least one point in every stratum of positive size.
+    :param sizes: sizes of the strata.
+    :param num_points: total number of points.
+    :returns: number of points of every stratum.
+    '''
+    sizes = np.asarray(sizes, dtype=float)
+    share = num_points * sizes / sizes.sum()
+    counts = np.where(sizes > 0, np.maximum(np.floor(share), 1), 0).astype(int)
+    if counts.sum() > num_points:
+        raise ValueError(f"{num_points} points cannot cover {np.count_nonzero(sizes)} strata!")
+    extra = num_points - counts.sum()
+    counts[np.argsort(counts - share, kind='stable')[:extra]] += 1
+    return counts
+
+def estimate_area_mean(values, weights=None, strata=None):
+    '''
+    Estimate of the mean of a region statistic over an area from sampled
+    regions, with the variance of the estimate. The estimate is the weighted
+    mean of the values. Within every stratum the variance is the one of a
+    self normalized importance sampling estimate, which for equal weights is
+    the sample variance over the number of samples, and the strata are
+    combined with the squares of their total weights.
+    :param values: statistic of the regions, None or nan for failed regions.
+    :param weights: sampling weights of the regions, defaults to ones.
+    :param strata: stratum of every region, defaults to a single stratum.
+    :returns: mean, variance -- the estimate and its estimated variance.
+    '''
+    values = np.asarray(values, dtype=float)
+    weights = np.ones(len(values)) if weights is None else np.asarray(weights, dtype=float)
+    strata = np.zeros(len(values), dtype=int) if strata is None else np.asarray(strata)
+    keep = np.isfinite(values)
+    values, weights, strata = values[keep], weights[keep], strata[keep]
+    if len(values) == 0:
+        return np.nan, np.nan
+
+    total = weights.sum()
+    mean = np.dot(weights, values) / total
+    pooled = np.var(values, ddof=1) if len(values) > 1 else np.nan
+    variance = 0.0
+    for stratum in np.unique(strata):
+        w = weights[strata == stratum]
+        y = values[strata == stratum]
+        share = w.sum() / total
+        if len(y) > 1:
+            local = np.dot(w, y) / w.sum()
+            spread = np.dot(w ** 2, (y - local) ** 2) / w.sum() ** 2 * len(y) / (len(y) - 1)
+        else:
+            # a single region gives no spread, so the one of the whole sample is used
+            spread = pooled
+        variance += share ** 2 * spread
+    return mean, variance
+
+
+def input_ratio(input_length, epsilon, projection=None):
+    '''
+    Ratio of the input length of a region to its size epsilon in degrees.
+    The input lengths of the degree frame are in radians and those of a
+    projected region in meters, which are divided by MEAN_RADIUS so that the
+    ratios of both frames compare.
+    '''
+    if input_length is None:
+        return None
+    if projection == 'laea':
+        input_length = input_length / MEAN_RADIUS
+    return input_length / epsilon
+
+
+# geometries of the worker processes of compute_regions_parallel
+REGION_WORKER = {}
+
+def geometry_to_arrays(geometry):
+    '''
+    Coordinates of a list of line geometries and the index of the geometry
+    every coordinate belongs to, cheap to send to worker processes.
+    '''
+    return shapely.get_coordinates(geometry, return_index=True)
+
+def arrays_to_geometry(coords, index):
+    '''
+    Rebuilds the list of LineStrings from geometry_to_arrays.
+    '''
+    return list(shapely.linestrings(coords, indices=index))
+
+def init_region_worker(act_arrays, synt_arrays, kwargs):
+    '''
+    Initializer of the worker processes. The networks arrive as coordinate
+    arrays once per worker (inherited without pickling when forked) and are
+    kept in REGION_WORKER for all regions evaluated by the worker. The
+    synthetic variants may also arrive as a PerturbationEnsemble.
+    '''
+    REGION_WORKER['fixture'] = FlatNormFixture('runTest')
+    REGION_WORKER['fixture'].triangulation_cache.cache_dir = kwargs.get('cache_dir')
+    REGION_WORKER['act_geom'] = arrays_to_geometry(*act_arrays)
+    REGION_WORKER['synt_arrays'] = synt_arrays
+    REGION_WORKER['synt_geom'] = {}
+    REGION_WORKER['kwargs'] = kwargs
+    return
+
+def region_worker(task):
+    '''
+    Flat norms of one region and one synthetic network variant for all
+    multiscale factors, and the Hausdorff distance if a distance is given.
+    '''
+    r, variant, region, epsilon, lambdas = task
+    fx = REGION_WORKER['fixture']
+    kwargs = REGION_WORKER['kwargs']
+    act_geom = REGION_WORKER['act_geom']
+    if isinstance(REGION_WORKER['synt_arrays'], PerturbationEnsemble):
+        # only the segments of the variant in the region become geometries
+        synt_geom = REGION_WORKER['synt_arrays'].clip(variant, region)
+    else:
+        if variant not in REGION_WORKER['synt_geom']:
+            # keep only the latest variant, consecutive tasks share it
+            REGION_WORKER['synt_geom'] = {
+                variant: arrays_to_geometry(*REGION_WORKER['synt_arrays'][variant])}
+        synt_geom = REGION_WORKER['synt_geom'][variant]
+
+    table = fx.compute_region_flatnorm_sweep(
+        region, act_geom, synt_geom, lambdas=lambdas, **kwargs)
+    if distance := kwargs.get('distance'):
+        hd, _ = fx.compute_hausdorff_batch(
+            [region], act_geom, [synt_geom], distance=distance,
+            method=kwargs.get('hausdorff_method', 'kdtree'))
+        hd = None if np.isnan(hd[0, 0]) else hd[0, 0]
+        table['hausdorff'] = [hd] * len(table['lambdas'])
+
+    table['region'] = [r] * len(table['lambdas'])
+    table['variant'] = [variant] * len(table['lambdas'])
+    table['epsilons'] = [epsilon] * len(table['lambdas'])
+    projection = kwargs.get('projection', fx.projection)
+    table['input_ratios'] = [
+        input_ratio(w, epsilon, projection) for w in table['input_lengths']]
+    min_x, min_y, max_x, max_y = region.bounds
+    table.update({
+        'MIN_X': [min_x] * len(table['lambdas']), 'MIN_Y': [min_y] * len(table['lambdas']),
+        'MAX_X': [max_x] * len(table['lambdas']), 'MAX_Y': [max_y] * len(table['lambdas'])})
+    return table
+
+
 class FlatNormFixture(unittest.TestCase):
 
     def __init__(self, methodName: str = ...) -> None:
         super().__init__(methodName)
         self.act_path = "./input/actual"
         self.synt_path = "./input/primnet"
+        self.store_path = "./input/store"
+        self.use_store = True
         self._out_dir = "out"
         self._fig_dir = "figs"
         self.area = 'mcbryde'
@@ -102,6 +374,20 @@ class FlatNormFixture(unittest.TestCase):
             'north_blacksburg': [150724, 150723, 150692],
             'patrick_henry': [150724, 150723, 150692],
         }
+
+        # spatial indices of the most recently queried networks
+        self.spatial_index_size = 8
+        self._spatial_index = {}
+
+        # densified networks and region points of the most recent Hausdorff distances
+        self._densified = {}
+        self._hausdorff_points = {}
+
+        # triangulations of the most recently evaluated regions
+        self.triangulation_cache = TriangulationCache()
+
+        # None triangulates in degrees, 'laea' in meters in a local frame
+        self.projection = None
         pass
 
     @property
@@ -138,7 +424,7 @@ class FlatNormFixture(unittest.TestCase):
                 output_geometry.append(geom)
         return output_geometry
 
-    def read_actual_network(self, area=None):
+    def read_actual_network(self, area=None, return_attributes=False):
         if not area:
             area = self.area
 
@@ -148,17 +434,19 @@ class FlatNormFixture(unittest.TestCase):
             raise ValueError(f"{act_edges_file} doesn't exist!")
 
         df_act = gpd.read_file(act_edges_file)
-        act_geom = []
-        for i in range(len(df_act)):
-            act_geom.extend(get_geometry(df_act['geometry'][i]))
+        start, end, act_edges = get_line_segments(list(df_act['geometry']))
+        act_geom = list(shapely.linestrings(np.stack((start, end), axis=1)))
 
         # Get convex hull of the region
         # act_lines = MultiLineString(act_geom)
         hull = MultiLineString(act_geom).convex_hull.buffer(5e-4)
 
+        if return_attributes:
+            # the shapefile row of every segment
+            return act_geom, hull, {'edge': np.array(act_edges, dtype=np.int64)}
         return act_geom, hull
 
-    def read_synthetic_network(self, codes=list(), area=None, hull=None):
+    def read_synthetic_network(self, codes=list(), area=None, hull=None, return_attributes=False):
         if not area:
             area = self.area
         # Synthetic network
@@ -168,55 +456,166 @@ class FlatNormFixture(unittest.TestCase):
         # synt_net = GetDistNet(self.synt_path, self.area_codes[area])
         synt_net = GetDistNet(self.synt_path, codes)
 
-        # Get the synthetic network edges in the region
+        # Get the synthetic network edges in the region, the edges of the
+        # graph joining two nodes inside the hull which are not homes
+        edges = list(synt_net.edges(data=True))
         if hull:
-            synt_nodes = [
-                n for n in synt_net.nodes
-                if Point(synt_net.nodes[n]['cord']).within(hull)
-                   and synt_net.nodes[n]['label'] != 'H'
-            ]
-            synt_net = nx.subgraph(synt_net, synt_nodes)
-
-        # synt_geom = []
-        # for e in synt_graph.edges:
-        #     synt_geom.extend(get_geometry(synt_net.edges[e]['geometry']))
-        synt_geom = [
-            g
-            # get_geometry(synt_net.edges[e]['geometry'])
-            for e in synt_net.edges
-            for g in get_geometry(synt_net.edges[e]['geometry'])
-        ]
-
+            nodes = list(synt_net.nodes(data=True))
+            cords = np.array([data['cord'] for _, data in nodes], dtype=float).reshape(-1, 2)
+            labels = np.array([data['label'] for _, data in nodes])
+            shapely.prepare(hull)
+            inside = shapely.contains_xy(hull, cords[:, 0], cords[:, 1]) & (labels != 'H')
+            synt_nodes = {n for (n, _), keep in zip(nodes, inside) if keep}
+            edges = [e for e in edges if e[0] in synt_nodes and e[1] in synt_nodes]
+
+        start, end, owner = get_line_segments([data['geometry'] for _, _, data in edges])
+        synt_geom = list(shapely.linestrings(np.stack((start, end), axis=1)))
+
+        if return_attributes:
+            # the end nodes and the label of the edge of every segment
+            return synt_geom, {
+                'edge': np.array([edges[i][:2] for i in owner]).reshape(-1, 2),
+                'label': np.array([edges[i][2]['label'] for i in owner], dtype=str)}
         return synt_geom
 
+    def network_sources(self, area=None):
+        """
+        Files the networks of an area are read from.
+        """
+        if not area:
+            area = self.area
+        act_files = sorted(glob.glob(f"{self.act_path}/{area}/{area}_edges.*"))
+        synt_files = [f"{self.synt_path}/{c}-dist-net.gpickle" for c in self.area_codes[area]]
+        return act_files + synt_files
+
+    def write_network_store(self, area=None):
+        """
+        Converts the shapefile of the actual network and the gpickles of the
+        synthetic network of an area to the binary store used by
+        read_networks. Run once per area, read_networks ignores a store whose
+        source files have changed since.
+        :returns: directory of the store.
+        """
+        if not area:
+            area = self.area
+        act_geom, hull, act_attr = self.read_actual_network(area, return_attributes=True)
+        synt_geom, synt_attr = self.read_synthetic_network(
+            area=area, hull=hull, return_attributes=True)
+
+        store_dir = f"{self.store_path}/{area}"
+        write_network_store(
+            store_dir,
+            {'actual': (act_geom, act_attr), 'synthetic': (synt_geom, synt_attr)},
+            hull, sources=self.network_sources(area),
+            area=area, codes=self.area_codes[area])
+        return store_dir
+
+    def read_network_store(self, area=None, return_attributes=False):
+        """
+        Networks and hull of an area from its binary store, memory mapped.
+        :returns: act_geom, synt_geom, hull and with return_attributes the
+            segment attributes of both networks.
+        """
+        if not area:
+            area = self.area
+        store = read_network_store(f"{self.store_path}/{area}")
+        act_geom = structure_to_geometry(store['actual']['vertices'], store['actual']['segments'])
+        synt_geom = structure_to_geometry(store['synthetic']['vertices'], store['synthetic']['segments'])
+        if return_attributes:
+            return act_geom, synt_geom, store['hull'], \
+                store['actual']['attributes'], store['synthetic']['attributes']
+        return act_geom, synt_geom, store['hull']
+
     def read_networks(self, area=None):
         if not area:
             area = self.area
 
-        # Actual network
-        act_geom, hull = self.read_actual_network(area)
-        
-        # Synthetic network
-        synt_geom = self.read_synthetic_network(area=area, hull=hull)
+        if self.use_store and is_store_current(f"{self.store_path}/{area}"):
+            act_geom, synt_geom, hull = self.read_network_store(area)
+        else:
+            # Actual network
+            act_geom, hull = self.read_actual_network(area)
+
+            # Synthetic network
+            synt_geom = self.read_synthetic_network(area=area, hull=hull)
+
+        # index the networks for region queries
+        self.get_spatial_index(act_geom)
+        self.get_spatial_index(synt_geom)
 
         return act_geom, synt_geom, hull
 
-    def read_stats(self, fn_stat_file, fn_city_file, in_dir=None):
+    def get_spatial_index(self, geometry):
+        """
+        STRtree of the geometries of a network. The tree is built once per
+        network list and cached for the spatial_index_size networks queried
+        most recently.
+        """
+        key = id(geometry)
+        cached = self._spatial_index.pop(key, None)
+        if cached is None or cached[0] is not geometry or cached[1] != len(geometry):
+            cached = (geometry, len(geometry), STRtree(geometry))
+        self._spatial_index[key] = cached
+        while len(self._spatial_index) > self.spatial_index_size:
+            self._spatial_index.pop(next(iter(self._spatial_index)))
+        return cached[2]
+
+    def query_regions(self, regions, geometry):
+        """
+        Finds the geometries of a network intersecting each of the regions in
+        one bulk query of its spatial index.
+        :param regions: list of region polygons.
+        :param geometry: list of network geometries.
+        :returns: list with the sorted indices of the intersecting geometries
+            for every region.
+        """
+        tree = self.get_spatial_index(geometry)
+        region_ind, geom_ind = tree.query(regions, predicate='intersects')
+        order = np.lexsort((geom_ind, region_ind))
+        region_ind, geom_ind = region_ind[order], geom_ind[order]
+        splits = np.searchsorted(region_ind, np.arange(1, len(regions)))
+        return np.split(geom_ind, splits)
+
+    def clip_geometry(self, region, geometry):
+        """
+        Geometries of a network intersecting the region, in network order.
+        """
+        return [geometry[i] for i in self.query_regions([region], geometry)[0]]
+
+    @staticmethod
+    def get_stats_path(file_name, in_dir=None):
+        """
+        Path of a stats table, the Parquet dataset if one was written and the
+        CSV file otherwise.
+        """
+        if in_dir:
+            file_name = f"{in_dir}/{file_name}"
+        if file_name.endswith(".csv") or file_name.endswith(".parquet"):
+            return file_name
+        if os.path.exists(f"{file_name}.parquet"):
+            return f"{file_name}.parquet"
+        return f"{file_name}.csv"
+
+    def read_stats(self, fn_stat_file, fn_city_file, in_dir=None, columns=None, filters=None):
         """
         :param fn_stat_file: f"{fx.area}-FN_STAT_R{num_regions}"
         :param fn_city_file: f"{fx.area}-FN_STAT_city"
+        :param columns: columns of the region stats to load, with the epsilons
+            and lambdas always loaded. All columns by default.
+        :param filters: filters of the region stats rows, such as
+            [('lambdas', 'in', [1000, 25000])], which skip the other
+            partitions of Parquet stats.
         :return: fn_df, city_df, city_ratio
         """
-        if in_dir:
-            fn_stat_file = f"{in_dir}/{fn_stat_file}"
-            fn_city_file = f"{in_dir}/{fn_city_file}"
+        fn_stat_file = self.get_stats_path(fn_stat_file, in_dir)
+        fn_city_file = self.get_stats_path(fn_city_file, in_dir)
+        if columns is not None:
+            columns = ['epsilons', 'lambdas'] + [col for col in columns if col not in ('epsilons', 'lambdas')]
 
-        fn_stat_file = fn_stat_file if fn_stat_file.endswith(".csv") else f"{fn_stat_file}.csv"
-        fn_city_file = fn_city_file if fn_city_file.endswith(".csv") else f"{fn_city_file}.csv"
-
-        fn_stat_df = pd.read_csv(
+        fn_stat_df = read_results(
             fn_stat_file,
-            sep=",",
+            columns=columns,
+            filters=filters,
             dtype={
                 'epsilons': float,
                 'lambdas': int,
@@ -234,31 +633,32 @@ class FlatNormFixture(unittest.TestCase):
         fn_stat_df['id'] = list(range(len(fn_stat_df)))
         fn_stat_df = fn_stat_df.set_index(['epsilons', 'lambdas'], drop=False)
 
-        fn_city_df = pd.read_csv(
-            fn_city_file,
-            sep=",",
-        )
+        fn_city_df = read_results(fn_city_file)
         fn_city_df = fn_city_df.set_index(['lambdas'], drop=False)
         city_ratio = fn_city_df['input_ratios'].max()
 
         return fn_stat_df, fn_city_df, city_ratio
     
-    def read_stability_stats(self, stability_stat_file, original_stat_file, in_dir=None):
+    def read_stability_stats(self, stability_stat_file, original_stat_file, in_dir=None,
+                             columns=None, filters=None):
         """
-        :param stability_stat_file: f"{fx.area}-FN_STAT_R{num_regions}"
-        :param fn_city_file: f"{fx.area}-FN_STAT_city"
-        :return: fn_df, city_df, city_ratio
+        :param stability_stat_file: f"{area}-L{lambda_}_FN_STABILITY_STAT_N{num_networks}_R{num_radius}"
+        :param original_stat_file: f"{area}-L{lambda_}_FN_STAT_INDEX"
+        :param columns: columns of the stability stats to load, with the
+            radius and index always loaded. All columns by default.
+        :param filters: filters of the stability stats rows, such as
+            [('radius', '==', 10)].
+        :return: fn_df, index_df
         """
-        if in_dir:
-            fn_stat_file = f"{in_dir}/{stability_stat_file}"
-            fn_index_file = f"{in_dir}/{original_stat_file}"
+        fn_stat_file = self.get_stats_path(stability_stat_file, in_dir)
+        fn_index_file = self.get_stats_path(original_stat_file, in_dir)
+        if columns is not None:
+            columns = ['radius', 'index'] + [col for col in columns if col not in ('radius', 'index')]
 
-        fn_stat_file = fn_stat_file if fn_stat_file.endswith(".csv") else f"{fn_stat_file}.csv"
-        fn_index_file = fn_index_file if fn_index_file.endswith(".csv") else f"{fn_index_file}.csv"
-        
-        fn_stat_df = pd.read_csv(
+        fn_stat_df = read_results(
             fn_stat_file,
-            sep=",",
+            columns=columns,
+            filters=filters,
             dtype={
                 'radius': float,
                 'flatnorms': np.float64,
@@ -277,10 +677,7 @@ class FlatNormFixture(unittest.TestCase):
         except:
             fn_stat_df = fn_stat_df.set_index(['index'], drop=False)
         
-        fn_index_df = pd.read_csv(
-            fn_index_file,
-            sep=",",
-        )
+        fn_index_df = read_results(fn_index_file)
         fn_index_df = fn_index_df.set_index(['index'], drop=False)
 
         return fn_stat_df, fn_index_df
@@ -290,53 +687,51 @@ class FlatNormFixture(unittest.TestCase):
         return point.buffer(epsilon, cap_style=sg.CAP_STYLE.square)
 
     @staticmethod
-    def random_points(poly, num_points=5):
-        min_x, min_y, max_x, max_y = poly.bounds
-        points = []
-        while len(points) < num_points:
-            random_point = Point([np.random.uniform(min_x, max_x),
-                                  np.random.uniform(min_y, max_y)])
-            if (random_point.within(poly)):
-                points.append(random_point)
-        return points
+    def random_points(poly, num_points=5, rng=None):
+        shapely.prepare(poly)
+        x, y = sample_uniform_points(
+            poly.bounds, lambda x, y: shapely.contains_xy(poly, x, y),
+            num_points, rng=rng)
+        return list(shapely.points(x, y))
 
     @staticmethod
-    def random_points_buffered(poly, epsilon=2e-3, tollerance=0.1, num_points=5):
-        min_x, min_y, max_x, max_y = poly.bounds
-        points = []
-        while len(points) < num_points:
-            random_point = Point([np.random.uniform(min_x, max_x),
-                                  np.random.uniform(min_y, max_y)])
-            region = random_point.buffer(epsilon, cap_style=sg.CAP_STYLE.square)
-            if random_point.within(poly) and region.intersection(poly).area / region.area > tollerance:
-                points.append(random_point)
-        return points
+    def random_points_buffered(poly, epsilon=2e-3, tollerance=0.1, num_points=5, rng=None):
+        shapely.prepare(poly)
+        def accept(x, y):
+            inside = shapely.contains_xy(poly, x, y)
+            regions = square_regions(x[inside], y[inside], epsilon)
+            ratio = shapely.area(shapely.intersection(regions, poly)) / shapely.area(regions)
+            inside[inside] = ratio > tollerance
+            return inside
+        x, y = sample_uniform_points(poly.bounds, accept, num_points, rng=rng)
+        return list(shapely.points(x, y))
 
     @staticmethod
-    def random_points_geom(poly, geom1, geom2, epsilon=2e-3, num_points=5):
-        geom1 = MultiLineString(geom1)
-        geom2 = MultiLineString(geom2)
-        min_x, min_y, max_x, max_y = poly.bounds
-        points = []
-        while len(points) < num_points:
-            # print(f"SAMPLED :: {len(points)} points")
-            random_point = Point([np.random.uniform(min_x, max_x),
-                                  np.random.uniform(min_y, max_y)])
-            region = random_point.buffer(epsilon, cap_style=sg.CAP_STYLE.square)
-            if random_point.within(poly):
-                if geom1.intersects(region) and geom2.intersects(region):
-                    points.append(random_point)
-
-        return points
+    def random_points_geom(poly, geom1, geom2, epsilon=2e-3, num_points=5, rng=None):
+        shapely.prepare(poly)
+        tree1 = STRtree(geom1)
+        tree2 = STRtree(geom2)
+        def accept(x, y):
+            inside = np.flatnonzero(shapely.contains_xy(poly, x, y))
+            regions = square_regions(x[inside], y[inside], epsilon)
+            hit1 = np.zeros(len(inside), dtype=bool)
+            hit2 = np.zeros(len(inside), dtype=bool)
+            hit1[tree1.query(regions, predicate='intersects')[0]] = True
+            hit2[tree2.query(regions, predicate='intersects')[0]] = True
+            accepted = np.zeros(len(x), dtype=bool)
+            accepted[inside[hit1 & hit2]] = True
+            return accepted
+        x, y = sample_uniform_points(poly.bounds, accept, num_points, rng=rng)
+        return list(shapely.points(x, y))
 
     def sample_regions(
             self, hull,
             num_regions=5, epsilon=2e-3,
-            regions_only=False, seed=None
+            regions_only=False, seed=None, rng=None
     ):
-        if seed:
+        if seed and rng is None:
             np.random.seed(seed)
-        point_list = self.random_points(hull, num_regions)
+        point_list = self.random_points(hull, num_regions, rng=rng)
         region_list = [
             pt.buffer(epsilon, cap_style=sg.CAP_STYLE.square) for pt in point_list
         ]
@@ -348,11 +743,11 @@ class FlatNormFixture(unittest.TestCase):
     def sample_regions_buffered(
             self, hull,
             num_regions=5, epsilon=2e-3, tollerance=0.1,
-            regions_only=False, seed=None
+            regions_only=False, seed=None, rng=None
     ):
-        if seed:
+        if seed and rng is None:
             np.random.seed(seed)
-        point_list = self.random_points_buffered(hull, epsilon, tollerance, num_regions)
+        point_list = self.random_points_buffered(hull, epsilon, tollerance, num_regions, rng=rng)
         region_list = [
             pt.buffer(epsilon, cap_style=sg.CAP_STYLE.square) for pt in point_list
         ]
@@ -364,11 +759,11 @@ class FlatNormFixture(unittest.TestCase):
     def sample_regions_geom(
             self, hull, act_geom, synt_geom,
             num_regions=5, epsilon=2e-3,
-            regions_only=False, seed=None
+            regions_only=False, seed=None, rng=None
     ):
-        if seed:
+        if seed and rng is None:
             np.random.seed(seed)
-        point_list = self.random_points_geom(hull, act_geom, synt_geom, epsilon,  num_regions)
+        point_list = self.random_points_geom(hull, act_geom, synt_geom, epsilon, num_regions, rng=rng)
         region_list = [
             pt.buffer(epsilon, cap_style=sg.CAP_STYLE.square) for pt in point_list
         ]
@@ -376,18 +771,185 @@ class FlatNormFixture(unittest.TestCase):
             return region_list
 
         return point_list, region_list
-        
+
+    @staticmethod
+    def get_sampling_domain(hull, act_geom, synt_geom, epsilon=2e-3):
+        """
+        Centres of the square regions of half width epsilon inside the hull
+        which intersect both networks, the points accepted by
+        random_points_geom. A square meets a segment when its centre lies in
+        the convex hull of the squares around the ends of the segment.
+        """
+        corners = epsilon * np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]])
+        def reach(geometry):
+            start, end = network_segments(geometry)
+            ends = np.concatenate((start[:, None, :] + corners, end[:, None, :] + corners), axis=1)
+            return shapely.union_all(shapely.convex_hull(shapely.multipoints(ends)))
+        domain = shapely.intersection(hull, shapely.intersection(reach(act_geom), reach(synt_geom)))
+        shapely.prepare(domain)
+        return domain
+
+    @staticmethod
+    def random_points_stratified(domain, num_points=5, kx=None, ky=None, rng=None):
+        """
+        Uniform points in the cells of a grid over the domain, allocated in
+        proportion to the area of the domain in every cell.
+        :param kx, ky: grid size, by default about two points per cell.
+        :returns: point_list, weights, strata -- the points, their weights in
+            the area mean and the grid cell of every point.
+        """
+        if not kx or not ky:
+            kx = ky = max(1, int(np.sqrt(num_points / 2)))
+        min_x, min_y, max_x, max_y = domain.bounds
+        cells = shapely.intersection(domain, partitions((min_x, max_x, min_y, max_y), kx, ky))
+        areas = shapely.area(cells)
+        counts = allocate_samples(areas, num_points)
+
+        xs, ys, weights, strata = [], [], [], []
+        for c in np.flatnonzero(counts):
+            cell = cells[c]
+            shapely.prepare(cell)
+            x, y = sample_uniform_points(
+                cell.bounds, lambda x, y: shapely.contains_xy(cell, x, y),
+                counts[c], rng=rng)
+            xs.append(x)
+            ys.append(y)
+            weights.append(np.full(counts[c], num_points * areas[c] / areas.sum() / counts[c]))
+            strata.append(np.full(counts[c], c))
+        point_list = list(shapely.points(np.concatenate(xs), np.concatenate(ys)))
+        return point_list, np.concatenate(weights), np.concatenate(strata)
+
+    @staticmethod
+    def random_points_qmc(domain, num_points=5, method='sobol', rng=None):
+        """
+        Scrambled Sobol or Halton points in the domain.
+        """
+        x, y = sample_qmc_points(
+            domain.bounds, lambda x, y: shapely.contains_xy(domain, x, y),
+            num_points, method=method, rng=rng)
+        return list(shapely.points(x, y))
+
+    @staticmethod
+    def random_points_length(domain, geometry, epsilon=2e-3, num_points=5, rng=None):
+        """
+        Points near the network, drawn as a point uniformly along the network
+        lines shifted uniformly within a square of half width epsilon. The
+        density of a point is proportional to the network length in the
+        square region around it, so the weights of the area mean are the
+        inverse of that length, normalized to a mean of one.
+        :param geometry: list of network geometries, usually both networks.
+        :returns: point_list, weights
+        """
+        if rng is None:
+            rng = np.random
+        start, end = network_segments(geometry)
+        lengths = np.hypot(*(end - start).T)
+        if lengths.sum() == 0:
+            raise ValueError("Cannot sample along a network of zero length!")
+
+        xs, ys = [], []
+        count = 0
+        while count < num_points:
+            size = max(64, 2 * (num_points - count))
+            seg = rng.choice(len(lengths), size, p=lengths / lengths.sum())
+            t = rng.random(size)[:, None]
+            shift = rng.uniform(-epsilon, epsilon, (size, 2))
+            centre = start[seg] + t * (end[seg] - start[seg]) + shift
+            accepted = np.flatnonzero(
+                shapely.contains_xy(domain, centre[:, 0], centre[:, 1]))[:num_points - count]
+            xs.append(centre[accepted, 0])
+            ys.append(centre[accepted, 1])
+            count += len(accepted)
+        x, y = np.concatenate(xs), np.concatenate(ys)
+
+        regions = square_regions(x, y, epsilon)
+        region_ind, geom_ind = STRtree(geometry).query(regions, predicate='intersects')
+        clipped = shapely.length(shapely.intersection(
+            regions[region_ind], np.asarray(geometry, dtype=object)[geom_ind]))
+        local = np.bincount(region_ind, weights=clipped, minlength=num_points)
+        weights = 1.0 / local
+        return list(shapely.points(x, y)), weights * num_points / weights.sum()
+
+    def sample_regions_strategy(
+            self, hull, act_geom, synt_geom,
+            num_regions=5, epsilon=2e-3, strategy='uniform',
+            seed=None, rng=None, domain=None, **kwargs
+    ):
+        """
+        Samples regions intersecting both networks with one of the
+        SAMPLING_STRATEGIES. Every strategy estimates the mean of a region
+        statistic over the sampling domain as the weighted mean
+        estimate_area_mean(values, weights, strata).
+            uniform: uniform points, the points of sample_regions_geom.
+            stratified: uniform points in every cell of a kx by ky grid.
+            sobol, halton: scrambled low discrepancy points.
+            length: points near the network lines, weighted by the inverse
+                of the network length in their region.
+        :param domain: the output of get_sampling_domain, computed if missing.
+        :param kwargs: kx, ky of the stratified grid.
+        :returns: point_list, region_list, weights, strata
+        """
+        if strategy not in SAMPLING_STRATEGIES:
+            raise ValueError(f"Unknown sampling strategy {strategy}! Choose from {list(SAMPLING_STRATEGIES)}")
+        if seed and rng is None:
+            np.random.seed(seed)
+        if domain is None:
+            domain = self.get_sampling_domain(hull, act_geom, synt_geom, epsilon)
+
+        weights = np.ones(num_regions)
+        strata = np.zeros(num_regions, dtype=int)
+        if strategy == 'uniform':
+            x, y = sample_uniform_points(
+                hull.bounds, lambda x, y: shapely.contains_xy(domain, x, y),
+                num_regions, rng=rng)
+            point_list = list(shapely.points(x, y))
+        elif strategy == 'stratified':
+            point_list, weights, strata = self.random_points_stratified(
+                domain, num_regions, kx=kwargs.get('kx'), ky=kwargs.get('ky'), rng=rng)
+        elif strategy in ('sobol', 'halton'):
+            point_list = self.random_points_qmc(domain, num_regions, method=strategy, rng=rng)
+        else:
+            point_list, weights = self.random_points_length(
+                domain, list(act_geom) + list(synt_geom), epsilon, num_regions, rng=rng)
+
+        region_list = [
+            pt.buffer(epsilon, cap_style=sg.CAP_STYLE.square) for pt in point_list
+        ]
+        return point_list, region_list, weights, strata
+
 
     def get_triangulated_currents(
             self, region, act_geom, synt_geom, **kwargs
     ):
+        """
+        Triangulation of the network segments in a region and the currents of
+        the two networks. Results are looked up in triangulation_cache by the
+        clipped segments and the triangulation options, unless called with
+        cache=False. The returned objects may be shared with later calls and
+        are read only.
+        With projection='laea' (by default the projection of the fixture) the
+        region is triangulated in a Lambert azimuthal equal-area frame in
+        meters centered at origin, by default the center of the region. The
+        flat norms are then measured in meters and square meters, and the
+        multiscale factors are per meter: lambda/MEAN_RADIUS is the factor of
+        the same scale as lambda in the degree frame.
+        """
         verbose = kwargs.get('verbose', False)
         adj = kwargs.get('adj', 1000)
         opts = kwargs.get('opts', "ps")
+        projection = kwargs.get('projection', self.projection)
+        if projection == 'laea':
+            origin = tuple(kwargs.get('origin') or region.centroid.coords[0])
+            params = dict(opts=opts, projection=projection, origin=origin)
+        elif projection is None:
+            origin = None
+            params = dict(adj=adj, opts=opts)
+        else:
+            raise ValueError(f"Unknown projection {projection}! Choose from [None, 'laea']")
 
         # get the actual network edges in the region
-        reg_act_geom = [g for g in act_geom if g.intersects(region)]
-        reg_synt_geom = [g for g in synt_geom if g.intersects(region)]
+        reg_act_geom = self.clip_geometry(region, act_geom)
+        reg_synt_geom = self.clip_geometry(region, synt_geom)
         sorted_act_geom = self.sort_geometry(reg_act_geom)
         sorted_synt_geom = self.sort_geometry(reg_synt_geom)
         if verbose:
@@ -399,10 +961,17 @@ class FlatNormFixture(unittest.TestCase):
         if len(sorted_act_geom) + len(sorted_synt_geom) == 0:
             return dict(), np.array([]), np.array([])
 
+        # reuse the triangulation of the same input segments
+        cache = self.triangulation_cache if kwargs.get('cache', True) else None
+        if cache is not None:
+            key = geometry_fingerprint(sorted_act_geom, sorted_synt_geom, **params)
+            if cached := cache.get(key):
+                return cached
+
         # Flat norm computation
         D = perform_triangulation(
             sorted_act_geom, sorted_synt_geom,
-            adj=adj, opts=opts,
+            adj=adj, opts=opts, origin=origin,
             verbose=verbose,
         )
         if D['triangulated'] == None:
@@ -410,12 +979,13 @@ class FlatNormFixture(unittest.TestCase):
             sys.exit(0)
 
         # computing currents
-        T1 = get_current(D['triangulated'], D['actual'])
-        T2 = get_current(D['triangulated'], D['synthetic'])
+        T1, T2 = get_currents(D['triangulated'], D['actual'], D['synthetic'])
         if verbose:
             print(f"Task completed: Actual[{abs(T1).sum()}] "
                   f"and synthetic[{abs(T2).sum()}] currents created")
 
+        if cache is not None:
+            cache.put(key, D, T1, T2)
         return D, T1, T2
 
     def compute_region_flatnorm(
@@ -445,13 +1015,32 @@ class FlatNormFixture(unittest.TestCase):
         # x: e-chain, s: t-chain,
         # norm: flat norm, enorm: weight of e-chain, tnorm: weight of t-chain,
         # w: vector of edges length of triangulation
-        x, s, norm, enorm, tnorm, w = msfn(
-            D['triangulated']['vertices'], D['triangulated']['triangles'], D['triangulated']['edges'],
-            input_current=T,
-            lambda_=lambda_,
-            k=np.pi / (180.0),
-            normalized=False
-        )
+        # solver 'lp' solves the flat norm LP, 'flow' the equivalent minimum
+        # cost tension problem on the dual graph of the triangulation with
+        # the solver flow_method, by default minimum cuts
+        solver = kwargs.get('solver', 'lp')
+        points, k = get_frame(D['triangulated'])
+        if solver == 'flow':
+            x, s, norm, enorm, tnorm, w = msfn_flow(
+                points, D['triangulated']['triangles'], D['triangulated']['edges'],
+                input_current=T,
+                lambda_=lambda_,
+                k=k,
+                normalized=False,
+                method=kwargs.get('flow_method', None),
+            )
+        elif solver == 'lp':
+            x, s, norm, enorm, tnorm, w = msfn(
+                points, D['triangulated']['triangles'], D['triangulated']['edges'],
+                input_current=T,
+                lambda_=lambda_,
+                k=k,
+                normalized=False,
+                backend=kwargs.get('backend', None),
+                formulation=kwargs.get('formulation', 'split'),
+            )
+        else:
+            raise ValueError(f"Unknown flat norm solver {solver}! Choose from ['lp', 'flow']")
 
         # --- normalization ---
         input_length = np.dot(abs(T1), abs(w)) + np.dot(abs(T2), abs(w))
@@ -474,19 +1063,179 @@ class FlatNormFixture(unittest.TestCase):
             return norm, enorm, tnorm, input_length, plot_data
 
         return norm, enorm, tnorm, input_length
+
+    def compute_region_flatnorm_sweep(
+            self, region=None, act_geom=None, synt_geom=None,
+            D=None, T1=None, T2=None,
+            lambdas=(1000,),
+            **kwargs
+    ):
+        """
+        Flat norms of a region for several multiscale factors. The region is
+        triangulated once and the LP is only re-solved with new costs. With
+        solver='flow' or formulation='reduced' (see compute_region_flatnorm)
+        the flat norm of every multiscale factor is solved on its own.
+        :returns: dictionary of lists with keys 'lambdas', 'flatnorms',
+            'norm_lengths', 'norm_areas', 'input_lengths'
+        """
+        normalized = kwargs.get('normalized', True)
+
+        # compute triangulation and currents
+        if not D:
+            D, T1, T2 = self.get_triangulated_currents(
+                region, act_geom, synt_geom, **kwargs)
+
+        if not D or T1.size == 0 or T2.size == 0:
+            warnings.warn(f"D={len(D)} : T1={T1.size} : T2={T2.size}")
+            return {'lambdas': list(lambdas), 'flatnorms': [None] * len(lambdas),
+                    'norm_lengths': [None] * len(lambdas), 'norm_areas': [None] * len(lambdas),
+                    'input_lengths': [None] * len(lambdas)}
+
+        points, k = get_frame(D['triangulated'])
+        if kwargs.get('solver', 'lp') == 'lp' and kwargs.get('formulation', 'split') == 'split':
+            table = msfn_sweep(
+                points, D['triangulated']['triangles'], D['triangulated']['edges'],
+                T1 - T2, lambdas,
+                k=k,
+                normalized=False,
+                backend=kwargs.get('backend', None),
+            )
+        else:
+            table = {'lambdas': [], 'flatnorms': [], 'norm_lengths': [], 'norm_areas': []}
+            for lambda_ in lambdas:
+                norm, enorm, tnorm, _ = self.compute_region_flatnorm(
+                    region, D=D, T1=T1, T2=T2, lambda_=lambda_,
+                    **dict(kwargs, normalized=False, plot=False))
+                table['lambdas'].append(lambda_)
+                table['flatnorms'].append(norm)
+                table['norm_lengths'].append(enorm)
+                table['norm_areas'].append(tnorm)
+
+        # --- normalization ---
+        w = simpvol(points, D['triangulated']['edges'], k=k)
+        input_length = np.dot(abs(T1), abs(w)) + np.dot(abs(T2), abs(w))
+        if normalized:
+            table['flatnorms'] = [norm / input_length for norm in table['flatnorms']]
+        table['input_lengths'] = [input_length] * len(table['lambdas'])
+        return table
     
+    def get_densified_network(self, geometry, sep=10):
+        """
+        Densified points of all the segments of a network and the offsets of
+        the points of every segment. Cached like the spatial index.
+        """
+        key = (id(geometry), sep)
+        cached = self._densified.pop(key, None)
+        if cached is None or cached[0] is not geometry or cached[1] != len(geometry):
+            points, owner = densify(list(geometry), sep=sep, return_owner=True)
+            offsets = np.searchsorted(owner, np.arange(len(geometry) + 1))
+            cached = (geometry, len(geometry), (points, offsets))
+        self._densified[key] = cached
+        while len(self._densified) > self.spatial_index_size:
+            self._densified.pop(next(iter(self._densified)))
+        return cached[2]
+
+    def get_hausdorff_points(self, region, geometry, index=None, distance="euclidean", sep=10):
+        """
+        Densified points and KD-tree of the segments of a network intersecting
+        a region, in the local metric frame at the center of the region for
+        geodesic distances. The points are taken from the densified network,
+        and are cached for the spatial_index_size regions evaluated most
+        recently, so that every region of the actual network is densified and
+        indexed once for all variants of the synthetic network.
+        :param index: indices of the segments in the region, if known.
+        """
+        key = (id(geometry), region.wkb, distance, sep)
+        cached = self._hausdorff_points.pop(key, None)
+        if cached is None or cached[0] is not geometry or cached[1] != len(geometry):
+            points, offsets = self.get_densified_network(geometry, sep=sep)
+            if index is None:
+                index = self.query_regions([region], geometry)[0]
+            cached = (geometry, len(geometry), prepare_points(
+                select_points(points, offsets, index), distance, region.centroid.coords[0]))
+        self._hausdorff_points[key] = cached
+        while len(self._hausdorff_points) > self.spatial_index_size:
+            self._hausdorff_points.pop(next(iter(self._hausdorff_points)))
+        return cached[2]
+
+    def compute_hausdorff_batch(
+            self, regions, act_geom, synt_geom,
+            distance="euclidean", method="kdtree", sep=10
+            ):
+        """
+        Hausdorff distances of many regions and many variants of the synthetic
+        network in one call. The actual network is densified once, and its
+        points in every region are indexed once and reused for all variants,
+        only the synthetic segments of a region are densified per variant.
+        :param regions: list of region polygons.
+        :param synt_geom: list of synthetic network geometries, or a list of
+            such lists (variants of the network), or a PerturbationEnsemble.
+        :param method: Hausdorff engine, see pyHausdorfflib.HAUSDORFF_METHODS.
+        :returns: hd, hd_geom -- array of dimension (regions x variants) of the
+            distances and the list of lists of the lines of the distances. The
+            distance is nan and the line None if a network has no segment in
+            the region.
+        """
+        act_index = self.query_regions(regions, act_geom)
+        if isinstance(synt_geom, PerturbationEnsemble):
+            # the segments of a variant near a region are clipped as arrays
+            ensemble = synt_geom
+            num_variants = len(ensemble)
+            candidates = [ensemble.region_segments(region) for region in regions]
+            def region_synt_geom(r, v):
+                return ensemble.clip(v, regions[r], index=candidates[r])
+        else:
+            variants = synt_geom if synt_geom and isinstance(synt_geom[0], list) else [synt_geom]
+            num_variants = len(variants)
+
+            # the segments of every variant are queried against one tree of the
+            # regions, instead of building a tree of every variant
+            region_tree = STRtree(regions)
+            def query_variant(geom):
+                geom_ind, region_ind = region_tree.query(geom, predicate='intersects')
+                order = np.lexsort((geom_ind, region_ind))
+                splits = np.searchsorted(region_ind[order], np.arange(1, len(regions)))
+                return np.split(geom_ind[order], splits)
+            synt_index = [query_variant(geom) for geom in variants]
+            def region_synt_geom(r, v):
+                return [variants[v][i] for i in synt_index[v][r]]
+
+        hd = np.full((len(regions), num_variants), np.nan)
+        hd_geom = [[None] * num_variants for _ in regions]
+        for r, region in enumerate(regions):
+            if len(act_index[r]) == 0:
+                continue
+            origin = region.centroid.coords[0]
+            for v in range(num_variants):
+                reg_synt_geom = region_synt_geom(r, v)
+                if len(reg_synt_geom) == 0:
+                    continue
+                if method == "kdtree":
+                    act = self.get_hausdorff_points(
+                        region, act_geom, index=act_index[r], distance=distance, sep=sep)
+                    synt = prepare_points(densify(reg_synt_geom, sep=sep), distance, origin)
+                    hd[r, v], pair = hausdorff_prepared(act, synt, distance=distance)
+                    hd_geom[r][v] = LineString((Point(pair[0]), Point(pair[1])))
+                else:
+                    reg_act_geom = [act_geom[i] for i in act_index[r]]
+                    hd[r, v], hd_geom[r][v] = compute_hausdorff(
+                        reg_act_geom, reg_synt_geom, distance=distance,
+                        method=method, sep=sep, origin=origin)
+        return hd, hd_geom
+
     def compute_region_hausdorff(
             self, region=None, act_geom=None, synt_geom=None, 
-            distance = "euclidean"
+            distance = "euclidean", method = "kdtree"
             ):
-        # get the actual network edges in the region
-        reg_act_geom = [g for g in act_geom if g.intersects(region)]
-        reg_synt_geom = [g for g in synt_geom if g.intersects(region)]
-        
+        """
+        :param method: Hausdorff engine, see pyHausdorfflib.HAUSDORFF_METHODS.
+        """
         # --- Hausdorff distance ---
-        hd, hd_geom = compute_hausdorff(reg_act_geom, reg_synt_geom,
-                                        distance=distance)
-        return hd, hd_geom
+        hd, hd_geom = self.compute_hausdorff_batch(
+            [region], act_geom, [synt_geom], distance=distance, method=method)
+        if hd_geom[0][0] is None:
+            raise ValueError("Hausdorff distance of an empty network!")
+        return hd[0, 0], hd_geom[0][0]
 
     def compute_region_metric(
             self, act_geom, synt_geom, 
@@ -500,6 +1249,7 @@ class FlatNormFixture(unittest.TestCase):
         hd, hd_geom = self.compute_region_hausdorff(
             region, act_geom, synt_geom,
             distance = kwargs.get("distance", "euclidean"),
+            method = kwargs.get("hausdorff_method", "kdtree"),
             )
         
         # compute flat norm
@@ -522,6 +1272,160 @@ class FlatNormFixture(unittest.TestCase):
                 )
             return norm, hd, w
 
+    def compute_regions_parallel(
+            self, regions, act_geom, synt_geom,
+            lambdas=(1000,), epsilons=None,
+            processes=None, chunksize=None,
+            sink=None, tags=None,
+            **kwargs
+    ):
+        """
+        Evaluates the flat norm of many independent regions in a pool of
+        worker processes. The networks are sent as coordinate arrays once per
+        worker instead of once per region.
+        :param regions: list of region polygons.
+        :param synt_geom: list of synthetic network geometries, or a list of
+            such lists (variants of the network) evaluated in every region, or
+            a PerturbationEnsemble of variants. The workers generate the
+            variants of an ensemble themselves.
+        :param lambdas: multiscale factors, all evaluated on one triangulation.
+        :param epsilons: region sizes for the input ratios, defaults to half
+            the width of every region.
+        :param processes: number of worker processes, defaults to all cores.
+            With processes=1 the regions are evaluated in this process.
+        :param sink: ResultSink receiving the rows of every region as soon as
+            it is evaluated. Regions whose rows are all in the sink already
+            are skipped.
+        :param tags: dictionary of values of additional columns, set in every
+            row before it is written, such as the area.
+        :param kwargs: passed on to compute_region_flatnorm_sweep, such as
+            solver, flow_method, formulation and backend, and
+            distance="euclidean"|"geodesic" also computes the Hausdorff distance
+            with the engine hausdorff_method.
+            The workers cache triangulations in cache_dir, by default the
+            directory of triangulation_cache.
+        :returns: DataFrame with one row per region, variant and lambda in this
+            order, with the columns written by the stats scripts and the tags.
+            Only the rows evaluated in this call are returned.
+        """
+        if isinstance(synt_geom, PerturbationEnsemble):
+            variants = synt_geom
+        else:
+            variants = synt_geom if synt_geom and isinstance(synt_geom[0], list) else [synt_geom]
+        if epsilons is None:
+            epsilons = [(region.bounds[2] - region.bounds[0]) / 2 for region in regions]
+        lambdas = list(lambdas)
+        tags = tags or {}
+        tasks = [
+            (r, v, region, epsilons[r], lambdas)
+            for r, region in enumerate(regions) for v in range(len(variants))]
+        if sink is not None:
+            tasks = [
+                task for task in tasks
+                if not all(sink.is_done({'region': task[0], 'variant': task[1],
+                                         'epsilons': task[3], 'lambdas': lambda_, **tags})
+                           for lambda_ in lambdas)]
+
+        columns = ['region', 'variant', 'epsilons', 'lambdas', 'flatnorms',
+                   'norm_lengths', 'norm_areas', 'input_lengths', 'input_ratios']
+        if kwargs.get('distance'):
+            columns.append('hausdorff')
+        columns.extend(['MIN_X', 'MIN_Y', 'MAX_X', 'MAX_Y'])
+        columns.extend(tag for tag in tags if tag not in columns)
+        if not tasks:
+            return pd.DataFrame(columns=columns)
+
+        # the workers share the triangulations on disk and the projection with this fixture
+        kwargs.setdefault('cache_dir', self.triangulation_cache.cache_dir)
+        kwargs.setdefault('projection', self.projection)
+        initargs = (geometry_to_arrays(act_geom),
+                    variants if isinstance(variants, PerturbationEnsemble)
+                    else [geometry_to_arrays(geom) for geom in variants],
+                    kwargs)
+        def evaluate():
+            if processes == 1:
+                init_region_worker(*initargs)
+                yield from map(region_worker, tasks)
+                return
+            # fork shares the arrays with the workers without pickling them
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+            n_proc = processes or os.cpu_count()
+            size = chunksize or max(1, len(tasks) // (4 * n_proc))
+            with context.Pool(n_proc, initializer=init_region_worker, initargs=initargs) as pool:
+                yield from pool.imap(region_worker, tasks, chunksize=size)
+
+        results = []
+        for table in evaluate():
+            table.update({tag: [value] * len(table['lambdas']) for tag, value in tags.items()})
+            if sink is not None:
+                sink.write({col: table[col] for col in columns})
+            results.append(table)
+        data = {col: [value for table in results for value in table[col]] for col in columns}
+        return pd.DataFrame(data, columns=columns)
+
+    def compare_sampling_strategies(
+            self, hull, act_geom, synt_geom,
+            strategies=SAMPLING_STRATEGIES, num_regions=20, repeats=10,
+            epsilon=2e-3, lambda_=1000, seed=None, processes=None,
+            **kwargs
+    ):
+        """
+        Estimator variance of the area mean of the normalized flat norm for
+        several sampling strategies. Every strategy draws repeats independent
+        samples of num_regions regions, and all regions are evaluated in one
+        call of compute_regions_parallel.
+        :param kwargs: passed on to sample_regions_strategy and
+            compute_regions_parallel.
+        :returns: report, runs -- DataFrames with one row per strategy and
+            one row per strategy and repeat. The report has the mean of the
+            estimates, their variance over the repeats, the mean of the
+            variance estimated from a single sample, the standard error, and
+            relative_solves, the number of LP solves needed for the confidence
+            interval of uniform sampling as a fraction of the uniform ones.
+        """
+        rng = np.random.default_rng(seed)
+        domain = self.get_sampling_domain(hull, act_geom, synt_geom, epsilon)
+        samples = []
+        for strategy in strategies:
+            for repeat in range(repeats):
+                _, regions, weights, strata = self.sample_regions_strategy(
+                    hull, act_geom, synt_geom,
+                    num_regions=num_regions, epsilon=epsilon, strategy=strategy,
+                    rng=rng, domain=domain, **kwargs)
+                samples.append((strategy, repeat, regions, weights, strata))
+
+        regions = [region for sample in samples for region in sample[2]]
+        kwargs.setdefault('normalized', True)
+        df = self.compute_regions_parallel(
+            regions, act_geom, synt_geom,
+            lambdas=[lambda_], epsilons=[epsilon] * len(regions),
+            processes=processes, **kwargs)
+        values = df['flatnorms'].to_numpy(dtype=float)
+
+        runs = {'strategy': [], 'repeat': [], 'estimate': [], 'variance': []}
+        for s, (strategy, repeat, _, weights, strata) in enumerate(samples):
+            mean, variance = estimate_area_mean(
+                values[s * num_regions:(s + 1) * num_regions], weights, strata)
+            runs['strategy'].append(strategy)
+            runs['repeat'].append(repeat)
+            runs['estimate'].append(mean)
+            runs['variance'].append(variance)
+        runs = pd.DataFrame(runs)
+
+        groups = runs.groupby('strategy', sort=False)
+        report = pd.DataFrame({
+            'regions': num_regions,
+            'repeats': groups['estimate'].count(),
+            'mean': groups['estimate'].mean(),
+            'variance': groups['estimate'].var(ddof=1),
+            'estimated_variance': groups['variance'].mean(),
+        })
+        report['std_error'] = np.sqrt(report['variance'])
+        if 'uniform' in report.index:
+            report['relative_solves'] = report['variance'] / report.loc['uniform', 'variance']
+        return report.reset_index(), runs
+
     def plot_regions_list(
             self,
             act_geom, synt_geom, regions_list, area=None,
@@ -11,90 +11,250 @@ from __future__ import absolute_import
 
 import numpy as np
 from scipy import sparse
-from shapely.geometry import LineString, Point, MultiLineString
+from scipy.spatial import cKDTree
+import shapely
+from shapely.geometry import LineString
 import triangle as tr
 
 from libs.pyUtilslib import simpvol, boundary_matrix
-from libs.pyLPsolverlib import lp_solver
-from libs.pyGeometrylib import geodist
+from libs.pyLPsolverlib import lp_solver, LPSequence
+from libs.pyFlowsolverlib import tension_solver
+from libs.pyGeometrylib import get_structure
+from libs.pyGeodesiclib import distance as geodesic_distance, project_laea, unproject_laea
 
 from timeit import default_timer as timer
 from datetime import timedelta
 
 def get_geometry(geometry):
-    vertices = [Point(c) for c in geometry.coords]
+    vertices = np.asarray(geometry.coords)
+    keep = geodesic_distance(vertices[:-1, :2], vertices[1:, :2]) > 1e-6
     return [LineString((pt1, pt2)) \
-            for pt1, pt2 in zip(vertices, vertices[1:]) \
-            if geodist(pt1, pt2) > 1e-6]
+            for pt1, pt2 in zip(vertices[:-1][keep], vertices[1:][keep])]
 
+def get_line_segments(geometry, tol=1e-6):
+    '''
+    Vectorized get_geometry for a list of line geometries. A tangent plane
+    estimate of the length decides all segments except those with a length
+    near the tolerance, which are measured with the geodesic distance.
+    :param geometry: list of line geometries.
+    :param tol: segments of a geodesic length upto tol meters are dropped.
+    :returns: start, end, owner -- the end points of the segments and the
+        index of the geometry every segment belongs to.
+    '''
+    if len(geometry) == 0:
+        return np.empty((0, 2)), np.empty((0, 2)), np.empty(0, dtype=int)
+    coords, index = shapely.get_coordinates(geometry, return_index=True)
+    same = index[1:] == index[:-1]
+    start, end, owner = coords[:-1][same], coords[1:][same], index[:-1][same]
 
-def get_current(triangle_structure, geometry) -> np.array:
-    current = []
-    vertices = triangle_structure['vertices'].tolist()
-    for edge in triangle_structure['edges'].tolist():
-        vert1 = Point(vertices[edge[0]])
-        vert2 = Point(vertices[edge[1]])
-        forward_geom = LineString((vert1, vert2))
-        reverse_geom = LineString((vert2, vert1))
-        for_eq = [forward_geom.equals_exact(geom, 1e-6) for geom in geometry]
-        rev_eq = [reverse_geom.equals_exact(geom, 1e-6) for geom in geometry]
-        if sum(for_eq) > 0:
-            current.append(1)
-        elif sum(rev_eq) > 0:
-            current.append(-1)
-        else:
-            current.append(0)
-    return np.array(current)
-
-
-def get_structure(geometry):
-    vertices = []
-    for geom in geometry:
-        geom_vertices = [Point(c) for c in geom.coords]
-        for c in geom_vertices:
-            if c not in vertices:
-                vertices.append(c)
-    segments = []
-    for geom in geometry:
-        ind1 = vertices.index(Point(geom.coords[0]))
-        ind2 = vertices.index(Point(geom.coords[1]))
-        segments.append((ind1, ind2))
-    struct = {'vertices': np.array([v.coords[0] for v in vertices]),
-              'segments': np.array(segments)}
-    return struct
+    approx = geodesic_distance(start, end, method='flat')
+    keep = approx > 10 * tol
+    unsure = np.flatnonzero((approx > tol / 10) & ~keep)
+    keep[unsure] = geodesic_distance(start[unsure], end[unsure]) > tol
+    return start[keep], end[keep], owner[keep]
 
 
-def get_segments(points, start):
-    sorted_indices = np.argsort([p.distance(start) for p in points])
-    sorted_points = [points[i] for i in sorted_indices]
-    return [LineString((sorted_points[i], sorted_points[i + 1])) \
-            for i in range(len(points) - 1)]
+def get_segment_index(triangle_structure, geometry, tol=1e-6):
+    '''
+    Maps every line segment to the pairs of triangulation vertices lying within
+    the tolerance of its two end points, which are the vertex pairs an edge
+    must join to match the segment.
+    :returns: segments, owner -- an array of dimension (kx2) of vertex index pairs
+        and the index of the line segment each pair was derived from.
+    :rtype: int, int
+    '''
+    if len(geometry) == 0:
+        return np.empty((0, 2), dtype=int), np.empty(0, dtype=int)
+    coords = np.array([geom.coords[:2] for geom in geometry])
+    tree = cKDTree(triangle_structure['vertices'])
+    near_start = tree.query_ball_point(coords[:, 0], r=tol)
+    near_end = tree.query_ball_point(coords[:, 1], r=tol)
+    n_start = np.array([len(n) for n in near_start], dtype=int)
+    n_end = np.array([len(n) for n in near_end], dtype=int)
+    start = np.array([i for n in near_start for i in n], dtype=int)
+    end = np.array([i for n in near_end for i in n], dtype=int)
+
+    # all combinations of start and end vertices of each line segment
+    start_owner = np.repeat(np.arange(len(geometry)), n_start)
+    repeats = n_end[start_owner]
+    owner = np.repeat(start_owner, repeats)
+    offset = np.arange(len(owner)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    end_offset = np.cumsum(n_end) - n_end
+    segments = np.column_stack((np.repeat(start, repeats), end[end_offset[owner] + offset]))
+    return segments, owner
+
+
+def get_edge_current(triangle_structure, segments) -> np.array:
+    '''
+    Builds the current on the triangulation edges from segments given as
+    pairs of vertex indices. An edge gets +1 if a segment runs along its
+    orientation, -1 if a segment runs against it and 0 otherwise.
+    '''
+    edges = triangle_structure['edges']
+    current = np.zeros(len(edges), dtype=int)
+    segments = np.asarray(segments, dtype=int).reshape(-1, 2)
+    segments = segments[segments[:, 0] != segments[:, 1]]
+    if len(edges) == 0 or len(segments) == 0:
+        return current
+
+    # locate every segment among the undirected edges
+    n_vertices = np.int64(max(edges.max(), segments.max())) + 1
+    edge_keys = edges.min(axis=1).astype(np.int64) * n_vertices + edges.max(axis=1)
+    seg_keys = segments.min(axis=1).astype(np.int64) * n_vertices + segments.max(axis=1)
+    sort_idx = np.argsort(edge_keys)
+    pos = np.minimum(np.searchsorted(edge_keys[sort_idx], seg_keys), len(edges) - 1)
+    edge_idx = sort_idx[pos]
+    found = edge_keys[edge_idx] == seg_keys
+    edge_idx = edge_idx[found]
+    forward = segments[found, 0] == edges[edge_idx, 0]
+
+    # a forward segment takes precedence over a reverse one
+    current[edge_idx[~forward]] = -1
+    current[edge_idx[forward]] = 1
+    return current
+
+
+def get_currents(triangle_structure, *geometries):
+    '''
+    Builds the currents of several geometries on one triangulation, locating
+    the end points of all geometries in a single vertex query.
+    '''
+    bounds = np.cumsum([len(geometry) for geometry in geometries])
+    segments, owner = get_segment_index(
+        triangle_structure, [g for geometry in geometries for g in geometry])
+    which = np.searchsorted(bounds, owner, side='right')
+    return [get_edge_current(triangle_structure, segments[which == i]) \
+            for i in range(len(geometries))]
 
 
-def update_segment(segments, vertices):
-    seg = []
-    for g in segments:
-        pt_list = []
-        for pt in vertices:
-            if g.distance(Point(pt)) < 1e-8:
-                pt_list.append(Point(pt))
-        seg.extend(get_segments(pt_list, Point(g.coords[0])))
-    return seg
+def get_current(triangle_structure, geometry) -> np.array:
+    segments, _ = get_segment_index(triangle_structure, geometry)
+    return get_edge_current(triangle_structure, segments)
+
+
+def split_segments(triangle_structure, segments, markers, tol=1e-8):
+    '''
+    Recovers how the input segments of a constrained triangulation were
+    subdivided. Each input segment is rebuilt from the output segments that
+    carry its marker. Segments whose marker chain does not run from start to
+    end, e.g. overlapping or duplicated input segments, are split instead at
+    the triangulation vertices lying within the tolerance, found with a
+    spatial index.
+    :param int segments: an array of dimension (nx2) of input segments.
+    :param int markers: the segment marker given to each input segment.
+    :returns: pairs, owner -- an array of dimension (kx2) of vertex index pairs
+        ordered by input segment and from its start to its end, and the index
+        of the input segment of each pair.
+    :rtype: int, int
+    '''
+    vertices = triangle_structure['vertices']
+    segments = np.asarray(segments, dtype=int).reshape(-1, 2)
+    n_segments = len(segments)
+    start = vertices[segments[:, 0]]
+    direction = vertices[segments[:, 1]] - start
+
+    # output segments carrying the marker of an input segment
+    lookup = np.full(max(np.max(markers, initial=0),
+                         np.max(triangle_structure.get('segment_markers', 0), initial=0)) + 1, -1)
+    lookup[markers] = np.arange(n_segments)
+    out_segments = np.asarray(triangle_structure.get('segments', np.empty((0, 2))), dtype=int).reshape(-1, 2)
+    out_owner = lookup[np.asarray(triangle_structure.get('segment_markers', np.empty(0)), dtype=int).ravel()]
+    sub = out_segments[out_owner >= 0]
+    own = out_owner[out_owner >= 0]
+
+    # orient every piece along its input segment and chain the pieces
+    t_start = ((vertices[sub[:, 0]] - start[own]) * direction[own]).sum(axis=1)
+    t_end = ((vertices[sub[:, 1]] - start[own]) * direction[own]).sum(axis=1)
+    sub = np.where((t_start > t_end)[:, None], sub[:, ::-1], sub)
+    order = np.lexsort((np.minimum(t_start, t_end), own))
+    sub, own = sub[order], own[order]
+    first = np.ones(len(own), dtype=bool)
+    first[1:] = own[1:] != own[:-1]
+    last = np.ones(len(own), dtype=bool)
+    last[:-1] = first[1:]
+    linked = np.ones(len(own), dtype=bool)
+    linked[1:] = sub[1:, 0] == sub[:-1, 1]
+    valid = np.where(first, sub[:, 0] == segments[own, 0], linked) \
+        & np.where(last, sub[:, 1] == segments[own, 1], True)
+    complete = np.bincount(own, minlength=n_segments) > 0
+    complete[own[~valid]] = False
+    keep = complete[own]
+    pairs, owner = [sub[keep]], [own[keep]]
+
+    # split the remaining segments at the vertices lying on them
+    missing = np.nonzero(~complete)[0]
+    if len(missing) > 0:
+        lines = shapely.linestrings(vertices[segments[missing]])
+        tree = shapely.STRtree(shapely.points(vertices))
+        line_idx, vert_idx = tree.query(lines, predicate='dwithin', distance=tol)
+        dist = shapely.distance(lines[line_idx], tree.geometries[vert_idx])
+        line_idx, vert_idx = line_idx[dist < tol], vert_idx[dist < tol]
+        seg_idx = missing[line_idx]
+        t = np.hypot(*(vertices[vert_idx] - start[seg_idx]).T)
+        order = np.lexsort((t, seg_idx))
+        seg_idx, vert_idx = seg_idx[order], vert_idx[order]
+        same = seg_idx[1:] == seg_idx[:-1]
+        pairs.append(np.column_stack((vert_idx[:-1], vert_idx[1:]))[same])
+        owner.append(seg_idx[:-1][same])
+
+    pairs, owner = np.vstack(pairs), np.concatenate(owner)
+    order = np.argsort(owner, kind='stable')
+    return pairs[order], owner[order]
 
 
 def prepare_triangulation(segments1, segments2):
     # Add rectangle envelope bounding the segments
-    all_lines = MultiLineString(segments1 + segments2)
-    rect_env = list(all_lines.minimum_rotated_rectangle.buffer(1e-4).boundary.coords)
-    extra_geom = [LineString((Point(rect_env[i]), Point(rect_env[i + 1]))) \
-                  for i in range(len(rect_env) - 1)]
+    all_lines = shapely.multilinestrings(list(segments1) + list(segments2))
+    rect_env = shapely.get_coordinates(shapely.boundary(
+        shapely.buffer(shapely.minimum_rotated_rectangle(all_lines), 1e-4, quad_segs=16)))
+    extra_geom = list(shapely.linestrings(np.stack((rect_env[:-1], rect_env[1:]), axis=1)))
 
     # Structure with added segments
-    struct = get_structure(extra_geom + segments1 + segments2)
+    struct = get_structure(extra_geom + list(segments1) + list(segments2))
     return struct
 
 
-def perform_triangulation(act_geom, syn_geom, adj=1, verbose=False, opts='ps'):
+def get_edges(triangles):
+    '''
+    Extracts the unique undirected edges of a triangulation.
+    Edges are ordered by their first appearance while traversing the sides
+    (0,1), (1,2), (2,0) of each triangle and keep the orientation in which
+    they were first seen.
+    :param int triangles: an array of dimension (nx3) of vertex indices.
+    :returns: edges, triangle_edges -- an array of dimension (mx2) of edges and
+        an array of dimension (nx3) of edge indices for the sides of each triangle.
+    :rtype: int, int
+    '''
+    triangles = np.asarray(triangles)
+    if triangles.size == 0:
+        return np.empty((0, 2), dtype=int), np.empty((0, 3), dtype=int)
+
+    # sides of every triangle in traversal order
+    sides = np.stack((triangles, np.roll(triangles, -1, axis=1)), axis=2).reshape(-1, 2)
+
+    # unique undirected sides ordered by first appearance
+    n_vertices = np.int64(triangles.max()) + 1
+    keys = sides.min(axis=1).astype(np.int64) * n_vertices + sides.max(axis=1)
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+
+    edges = sides[first[order]]
+    triangle_edges = rank[inverse.ravel()].reshape(-1, 3)
+    return edges, triangle_edges
+
+
+def perform_triangulation(act_geom, syn_geom, adj=1, verbose=False, opts='ps', origin=None):
+    '''
+    Constrained triangulation of the actual and synthetic network segments.
+    :param adj: scale of the shifted degrees given to Triangle, unless
+        projected.
+    :param origin: (longitude, latitude) of a local Lambert azimuthal
+        equal-area frame. The segments are then triangulated in meters, and
+        the metric coordinates are kept as 'xy' of the triangulation next
+        to the 'vertices' in degrees.
+    '''
     # Initialize dictionary
     dict_struct = {}
 
@@ -106,10 +266,15 @@ def perform_triangulation(act_geom, syn_geom, adj=1, verbose=False, opts='ps'):
 
     # Perform constrained triangulation
     vertices = struct['vertices']
-    adj_vertices = adj * (vertices + np.column_stack([[80] * len(vertices),
-                                                      [-37] * len(vertices)]))
+    shift = np.array([80, -37])
+    if origin is None:
+        adj_vertices = adj * (vertices + shift)
+    else:
+        adj_vertices = project_laea(vertices, origin)
+    markers = np.arange(len(struct['segments'])) + 2
     adj_struct = {'vertices': adj_vertices,
-                  'segments': struct['segments']}
+                  'segments': struct['segments'],
+                  'segment_markers': markers.reshape(-1, 1)}
     # try:
     if verbose:
         start_tri = timer()
@@ -123,29 +288,35 @@ def perform_triangulation(act_geom, syn_geom, adj=1, verbose=False, opts='ps'):
         print(f"Task completed: Performed triangulation on points : t={timedelta(seconds=end_tri-start_tri)}")
 
     adj_tri_vertices = adj_tri_struct['vertices']
-    adj_mat = np.column_stack([[80] * len(adj_tri_vertices),
-                               [-37] * len(adj_tri_vertices)])
-    tri_struct = {'vertices': (adj_tri_vertices / adj) - adj_mat,
-                  'segments': adj_tri_struct['segments'],
+    if origin is None:
+        tri_vertices = (adj_tri_vertices / adj) - shift
+    else:
+        # input vertices keep their coordinates, added ones are unprojected
+        tri_vertices = np.concatenate(
+            (vertices, unproject_laea(adj_tri_vertices[len(vertices):], origin)))
+    tri_struct = {'vertices': tri_vertices,
+                  'segments': adj_tri_struct.get('segments', np.empty((0, 2), dtype=int)),
+                  'segment_markers': adj_tri_struct.get('segment_markers', np.empty((0, 1), dtype=int)),
                   'triangles': adj_tri_struct['triangles']}
 
-    edges = []
-    for tgl in tri_struct['triangles']:
-        if ([tgl[0], tgl[1]] not in edges) and ([tgl[1], tgl[0]] not in edges):
-            edges.append([tgl[0], tgl[1]])
-        if ([tgl[1], tgl[2]] not in edges) and ([tgl[2], tgl[1]] not in edges):
-            edges.append([tgl[1], tgl[2]])
-        if ([tgl[2], tgl[0]] not in edges) and ([tgl[0], tgl[2]] not in edges):
-            edges.append([tgl[2], tgl[0]])
-    tri_struct['edges'] = np.array(edges)
+    edges, triangle_edges = get_edges(tri_struct['triangles'])
+    tri_struct['edges'] = edges
+    tri_struct['triangle_edges'] = triangle_edges
+    if origin is not None:
+        tri_struct['xy'] = adj_tri_vertices
     dict_struct['triangulated'] = tri_struct
     if verbose:
         print("Task completed: Performed triangulation on points")
 
     # update input geometries with intersecting points
-    V = tri_struct['vertices'].tolist()
-    dict_struct['actual'] = update_segment(act_geom, V)
-    dict_struct['synthetic'] = update_segment(syn_geom, V)
+    n_extra = len(struct['segments']) - len(act_geom) - len(syn_geom)
+    pairs, owner = split_segments(tri_struct, struct['segments'][n_extra:], markers[n_extra:])
+    is_actual = owner < len(act_geom)
+    geom = shapely.linestrings(tri_struct['vertices'][pairs]) if len(pairs) else np.array([])
+    dict_struct['actual'] = list(geom[is_actual])
+    dict_struct['synthetic'] = list(geom[~is_actual])
+    dict_struct['actual_segments'] = pairs[is_actual]
+    dict_struct['synthetic_segments'] = pairs[~is_actual]
     if verbose:
         print("Task completed: Updated geometries with intersecting points")
 
@@ -158,9 +329,55 @@ def perform_triangulation(act_geom, syn_geom, adj=1, verbose=False, opts='ps'):
     return dict_struct
 
 
+def get_frame(triangle_structure):
+    '''
+    Points of a triangulation in which lengths and areas are measured, and
+    the scale for simpvol: the metric coordinates of a projected
+    triangulation, else the degrees scaled to radians.
+    :returns: points, k
+    '''
+    if 'xy' in triangle_structure:
+        return triangle_structure['xy'], 1
+    return triangle_structure['vertices'], np.pi / 180.0
+
+
 # %% flat norm computation
+def is_empty(a):
+    '''
+    Checks whether an optional array argument was left out. Works for lists,
+    numpy arrays and scipy sparse matrices alike, unlike comparing with [].
+    '''
+    if a is None:
+        return True
+    if sparse.issparse(a):
+        return a.shape[0] == 0
+    return np.size(a) == 0
+
+def msfn_constraints(simplices, subsimplices):
+    '''
+    Constraint matrix [I, -I, B, -B] of the flat norm LP where B is the
+    boundary matrix of the simplices.
+    '''
+    m_subsimplices = subsimplices.shape[0]
+    b_matrix = boundary_matrix(simplices, subsimplices, format='coo')
+    m_subsimplices_identity = sparse.identity(m_subsimplices, dtype=np.int8, format='coo')
+    return sparse.hstack((m_subsimplices_identity, -m_subsimplices_identity, b_matrix, -b_matrix))
+
+def get_chains(sol, m_subsimplices, n_simplices):
+    '''
+    Reads the p-chain and the (p+1)-chain from a solution of the flat norm LP
+    with constraint matrix [I, -I, B, -B].
+    '''
+    x = np.rint(sol[0:m_subsimplices] - sol[m_subsimplices:2 * m_subsimplices]).reshape((1, m_subsimplices)).astype(int)
+    s = np.rint(
+            sol[2 * m_subsimplices:2 * m_subsimplices + n_simplices] -
+            sol[2 * m_subsimplices + n_simplices:]
+    ).reshape(1, n_simplices).astype(int)
+    return x, s
+
 def msfn(points, simplices, subsimplices, input_current, lambda_,
-         w=[], v=[], cons=[], k=1, normalized=False):
+         w=[], v=[], cons=[], k=1, normalized=False, backend=None,
+         formulation='split'):
     '''
     MSFN - Multiscale flat norm
     Accepts simplicial settings, an input current, multiscale factor(:math:`\lambda`).
@@ -176,33 +393,288 @@ def msfn(points, simplices, subsimplices, input_current, lambda_,
     :param float w: a vector of subsimplices volumes.
     :param float v: a vector of simplices volumes.
     :param int cons: a constraint matrix A.
+    :param str backend: LP solver backend, see pyLPsolverlib.LP_SOLVERS.
+    :param str formulation: 'split' solves the equality constrained LP with
+        constraint matrix [I, -I, B, -B]. 'reduced' eliminates the negative part
+        of the p-chain and solves the inequality constrained LP with constraint
+        matrix [I, B, -B], that is, m fewer variables.
     :returns: x, s, norm-- p-chain, (p+1)-chain of flat norm decompostion, flat norm.
     :rtype: int, int, float.
     '''
     m_subsimplices = subsimplices.shape[0]
     n_simplices = simplices.shape[0]
-    if w == []:
+    if is_empty(w):
         w = simpvol(points, subsimplices, k=k)
-    if v == []:
+    if is_empty(v):
         v = simpvol(points, simplices, k=k)
-    if cons == []:
-        b_matrix = boundary_matrix(simplices, subsimplices, format='coo')
-        m_subsimplices_identity = sparse.identity(m_subsimplices, dtype=np.int8, format='coo')
-        cons = sparse.hstack((m_subsimplices_identity, -m_subsimplices_identity, b_matrix, -b_matrix))
+    if formulation == 'reduced':
+        return msfn_reduced(points, simplices, subsimplices, input_current, lambda_,
+                            w=w, v=v, cons=cons, k=k, normalized=normalized,
+                            backend=backend)
+    if formulation != 'split':
+        raise ValueError(f"Unknown LP formulation {formulation}! Choose from ['split', 'reduced']")
+    if is_empty(cons):
+        cons = msfn_constraints(simplices, subsimplices)
 
     # compute the flat norm distance
     c = np.concatenate((abs(w), abs(w), lambda_ * abs(v), lambda_ * abs(v)))
     c.reshape(len(c), 1)
-    sol, norm = lp_solver(c, cons, input_current)
-    x = (sol[0:m_subsimplices] - sol[m_subsimplices:2 * m_subsimplices]).reshape((1, m_subsimplices)).astype(int)
-    s = (
-            sol[2 * m_subsimplices:2 * m_subsimplices + n_simplices] -
-            sol[2 * m_subsimplices + n_simplices:]
-    ).reshape(1, n_simplices).astype(int)
+    sol, norm = lp_solver(c, cons, input_current, backend=backend)
+    x, s = get_chains(sol, m_subsimplices, n_simplices)
+
+    # Compute the two parts of the norm
+    norm_subsimplices = np.dot(abs(x), abs(w))[0]
+    norm_simplices = np.dot(abs(s), abs(v))[0]
+
+    # Normalize by total length of current
+    if normalized:
+        input_current_w = np.dot(abs(input_current), abs(w))
+        norm = norm / input_current_w
+
+    return x, s, norm, norm_subsimplices, norm_simplices, w
+
+def msfn_reduced(points, simplices, subsimplices, input_current, lambda_,
+                 w=[], v=[], cons=[], k=1, normalized=False, backend=None):
+    '''
+    Multiscale flat norm with the reduced LP formulation.
+    The p-chain x = T - Bs is written as x = x+ - x- with x- = x+ - T + Bs, so
+    that the flat norm |w|(x+ + x-) + lambda |v|(s+ + s-) becomes
+        2|w|x+ + (lambda |v| + B^T |w|)s+ + (lambda |v| - B^T |w|)s- - |w|T
+    subject to x+ + Bs+ - Bs- >= T and non-negative variables. The LP has
+    m + 2n variables and m inequality rows instead of 2m + 2n variables.
+    Accepts and returns the same arguments as msfn. If the constraint matrix
+    [I, -I, B, -B] of msfn is provided, the boundary matrix is taken from it.
+    '''
+    m_subsimplices = subsimplices.shape[0]
+    n_simplices = simplices.shape[0]
+    if is_empty(w):
+        w = simpvol(points, subsimplices, k=k)
+    if is_empty(v):
+        v = simpvol(points, simplices, k=k)
+    if is_empty(cons):
+        b_matrix = boundary_matrix(simplices, subsimplices, format='csr')
+    else:
+        b_matrix = sparse.csc_matrix(cons)[:, 2 * m_subsimplices:2 * m_subsimplices + n_simplices]
+        b_matrix = b_matrix.tocsr()
+    m_subsimplices_identity = sparse.identity(m_subsimplices, dtype=np.int8, format='csr')
+    cons = sparse.hstack((m_subsimplices_identity, b_matrix, -b_matrix), format='csr')
+
+    # compute the flat norm distance
+    current = np.asarray(input_current, dtype=float).ravel()
+    w_b = b_matrix.T @ abs(w)
+    c = np.concatenate((2 * abs(w), lambda_ * abs(v) + w_b, lambda_ * abs(v) - w_b))
+    sol, norm = lp_solver(c, cons, current, backend=backend, inequality=True)
+    norm = norm - np.dot(abs(w), current)
+    s = np.rint(
+            sol[m_subsimplices:m_subsimplices + n_simplices] -
+            sol[m_subsimplices + n_simplices:]
+    ).reshape(n_simplices).astype(int)
+    x = np.rint(current - b_matrix @ s).reshape(1, m_subsimplices).astype(int)
+    s = s.reshape(1, n_simplices)
+
+    # Compute the two parts of the norm
+    norm_subsimplices = np.dot(abs(x), abs(w))[0]
+    norm_simplices = np.dot(abs(s), abs(v))[0]
+
+    # Normalize by total length of current
+    if normalized:
+        input_current_w = np.dot(abs(input_current), abs(w))
+        norm = norm / input_current_w
+
+    return x, s, norm, norm_subsimplices, norm_simplices, w
+
+def msfn_sweep(points, simplices, subsimplices, input_current, lambdas,
+               k=1, normalized=False, backend=None, return_chains=False):
+    '''
+    Multiscale flat norm for a sequence of multiscale factors on the same
+    simplicial complex and input current. The volumes and the constraint
+    matrix are built once and only the cost vector changes between solves,
+    which are warm started where the backend allows, see
+    pyLPsolverlib.LPSequence.
+    :param float lambdas: sequence of multiscale factors.
+    :param bool return_chains: also return the p-chains and (p+1)-chains.
+    :returns: table -- dictionary of lists with keys 'lambdas', 'flatnorms',
+        'norm_lengths' and 'norm_areas' (and 'echains', 'tchains').
+    :rtype: dict
+    '''
+    m_subsimplices = subsimplices.shape[0]
+    n_simplices = simplices.shape[0]
+    w = simpvol(points, subsimplices, k=k)
+    v = simpvol(points, simplices, k=k)
+    lp_sequence = LPSequence(msfn_constraints(simplices, subsimplices),
+                             input_current, backend=backend)
+    input_current_w = np.dot(abs(input_current), abs(w))
+
+    table = {'lambdas': [], 'flatnorms': [], 'norm_lengths': [], 'norm_areas': []}
+    if return_chains:
+        table.update({'echains': [], 'tchains': []})
+    for lambda_ in lambdas:
+        c = np.concatenate((abs(w), abs(w), lambda_ * abs(v), lambda_ * abs(v)))
+        sol, norm = lp_sequence.solve(c)
+        x, s = get_chains(sol, m_subsimplices, n_simplices)
+        if normalized:
+            norm = norm / input_current_w
+        table['lambdas'].append(lambda_)
+        table['flatnorms'].append(norm)
+        table['norm_lengths'].append(np.dot(abs(x), abs(w))[0])
+        table['norm_areas'].append(np.dot(abs(s), abs(v))[0])
+        if return_chains:
+            table['echains'].append(x)
+            table['tchains'].append(s)
+    return table
+
+def msfn_breakpoints(points, simplices, subsimplices, input_current,
+                     lambda_min, lambda_max, k=1, backend=None, tol=1e-9):
+    '''
+    Finds the multiscale factors at which the flat norm decomposition changes.
+    The flat norm F(lambda) = min_s |w||x| + lambda |v||s| is the lower envelope
+    of the lines of all decompositions, hence concave and piecewise linear.
+    The pieces are found by the Eisner-Severance method: the lines optimal at
+    both ends of an interval are intersected and the LP is solved there. If
+    no decomposition lies below the intersection, it is a breakpoint,
+    otherwise both halves are searched.
+    :param float lambda_min, lambda_max: interval of multiscale factors.
+    :param float tol: relative tolerance to compare flat norms.
+    :returns: pieces -- dictionary of lists with keys 'lambda_start',
+        'lambda_end', 'norm_lengths' and 'norm_areas' for every piece of the
+        flat norm, in increasing order of the multiscale factor.
+    :rtype: dict
+    '''
+    w = simpvol(points, subsimplices, k=k)
+    v = simpvol(points, simplices, k=k)
+    m_subsimplices = subsimplices.shape[0]
+    n_simplices = simplices.shape[0]
+    lp_sequence = LPSequence(msfn_constraints(simplices, subsimplices),
+                             input_current, backend=backend)
+
+    def solve(lambda_):
+        c = np.concatenate((abs(w), abs(w), lambda_ * abs(v), lambda_ * abs(v)))
+        sol, _ = lp_sequence.solve(c)
+        x, s = get_chains(sol, m_subsimplices, n_simplices)
+        return np.dot(abs(x), abs(w))[0], np.dot(abs(s), abs(v))[0]
+
+    lines = [solve(lambda_min), solve(lambda_max)]
+    intervals = [(lines[0], lines[1])]
+    while intervals:
+        (a_lo, v_lo), (a_hi, v_hi) = intervals.pop()
+        if v_lo - v_hi <= tol * max(v_lo, v_hi):
+            continue
+        lambda_ = (a_hi - a_lo) / (v_lo - v_hi)
+        a_mid, v_mid = solve(lambda_)
+        lines.append((a_mid, v_mid))
+        norm_line = a_lo + lambda_ * v_lo
+        if a_mid + lambda_ * v_mid < norm_line - tol * abs(norm_line) and v_hi < v_mid < v_lo:
+            intervals.append(((a_lo, v_lo), (a_mid, v_mid)))
+            intervals.append(((a_mid, v_mid), (a_hi, v_hi)))
+
+    # walk the lower envelope from the decomposition optimal at lambda_min
+    lines = sorted(set(lines), key=lambda line: (-line[1], line[0]))
+    current = min(range(len(lines)),
+                  key=lambda l: (lines[l][0] + lambda_min * lines[l][1], lines[l][1]))
+    pieces = {'lambda_start': [], 'lambda_end': [], 'norm_lengths': [], 'norm_areas': []}
+    lambda_start = lambda_min
+    while True:
+        a_cur, v_cur = lines[current]
+        lambda_end, following = lambda_max, None
+        for nxt in range(current + 1, len(lines)):
+            a_nxt, v_nxt = lines[nxt]
+            if v_cur - v_nxt <= tol * max(v_cur, v_nxt):
+                continue
+            cross = max((a_nxt - a_cur) / (v_cur - v_nxt), lambda_start)
+            if cross < lambda_end:
+                lambda_end, following = cross, nxt
+        pieces['lambda_start'].append(lambda_start)
+        pieces['lambda_end'].append(lambda_end)
+        pieces['norm_lengths'].append(a_cur)
+        pieces['norm_areas'].append(v_cur)
+        if following is None:
+            break
+        lambda_start, current = lambda_end, following
+    return pieces
+
+def triangle_orientation(points, simplices):
+    '''
+    Orientation of the triangles in the plane: +1 for counterclockwise and -1
+    for clockwise vertex order. Degenerate triangles keep their vertex order.
+    '''
+    p = np.asarray(points)[np.asarray(simplices)]
+    area = (p[:, 1, 0] - p[:, 0, 0]) * (p[:, 2, 1] - p[:, 0, 1]) - \
+        (p[:, 1, 1] - p[:, 0, 1]) * (p[:, 2, 0] - p[:, 0, 0])
+    return np.where(area < 0, -1, 1)
+
+def get_dual_graph(points, simplices, subsimplices, b_matrix=None):
+    '''
+    Dual graph of a planar triangulation with the outside as an extra node.
+    Every edge becomes an arc from the triangle on its positive side to the
+    one on its negative side, where the triangles are counterclockwise, so
+    that the boundary of a 2-chain s is the tension of the potentials s.
+    :param float points: points of the triangulation.
+    :param int simplices: triangles, an array of dimension (nx3).
+    :param int subsimplices: edges, an array of dimension (mx2).
+    :param b_matrix: boundary matrix of the triangles (optional).
+    :returns: orientation, tails, heads -- orientation of the triangles and
+        end nodes of the m arcs. The outer node is numbered n.
+    '''
+    n_simplices = simplices.shape[0]
+    m_subsimplices = subsimplices.shape[0]
+    if b_matrix is None:
+        b_matrix = boundary_matrix(simplices, subsimplices, format='coo')
+    orientation = triangle_orientation(points, simplices)
+    b_matrix = sparse.coo_matrix(b_matrix)
+    signs = b_matrix.data * orientation[b_matrix.col]
+
+    tails = np.full(m_subsimplices, n_simplices)
+    heads = np.full(m_subsimplices, n_simplices)
+    positive = signs > 0
+    negative = signs < 0
+    count_pos = np.bincount(b_matrix.row[positive], minlength=m_subsimplices)
+    count_neg = np.bincount(b_matrix.row[negative], minlength=m_subsimplices)
+    if (count_pos > 1).any() or (count_neg > 1).any():
+        raise ValueError("Triangulation is not a consistently oriented planar triangulation!")
+    tails[b_matrix.row[positive]] = b_matrix.col[positive]
+    heads[b_matrix.row[negative]] = b_matrix.col[negative]
+    return orientation, tails, heads
+
+def msfn_flow(points, simplices, subsimplices, input_current, lambda_,
+              w=[], v=[], k=1, normalized=False, method=None):
+    '''
+    Multiscale flat norm of a 1-current in a planar triangulation as a minimum
+    cost flow problem on the dual graph. With s the 2-chain read as potentials
+    of the triangles (and zero outside), the flat norm
+        sum_e |w_e| |T_e - (Bs)_e| + lambda sum_t |v_t| |s_t - 0|
+    is a minimum cost tension problem on the dual graph where every triangle
+    is also joined to the outer node by an arc of weight lambda |v_t|.
+    Accepts and returns the same arguments as msfn.
+    :param str method: flow solver, see pyFlowsolverlib.FLOW_SOLVERS.
+    '''
+    if simplices.shape[1] != 3 or np.asarray(points).shape[1] != 2:
+        raise ValueError("msfn_flow requires a 1-current in a planar triangulation!")
+    m_subsimplices = subsimplices.shape[0]
+    n_simplices = simplices.shape[0]
+    if is_empty(w):
+        w = simpvol(points, subsimplices, k=k)
+    if is_empty(v):
+        v = simpvol(points, simplices, k=k)
+    b_matrix = boundary_matrix(simplices, subsimplices, format='csr')
+    orientation, tails, heads = get_dual_graph(points, simplices, subsimplices, b_matrix)
+
+    # arcs of the edges followed by the arcs of the triangles to the outside
+    current = np.asarray(input_current, dtype=float).ravel()
+    tails = np.concatenate((tails, np.arange(n_simplices)))
+    heads = np.concatenate((heads, np.full(n_simplices, n_simplices)))
+    offsets = np.concatenate((current, np.zeros(n_simplices)))
+    weights = np.concatenate((abs(w), lambda_ * abs(v)))
+    potentials = tension_solver(n_simplices + 1, tails, heads, offsets, weights,
+                                root=n_simplices, method=method)
+
+    s = orientation * potentials[:n_simplices]
+    x = np.rint(current - b_matrix @ s).reshape(1, m_subsimplices).astype(int)
+    s = s.reshape(1, n_simplices)
 
     # Compute the two parts of the norm
     norm_subsimplices = np.dot(abs(x), abs(w))[0]
     norm_simplices = np.dot(abs(s), abs(v))[0]
+    norm = norm_subsimplices + lambda_ * norm_simplices
 
     # Normalize by total length of current
     if normalized:
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 15:04:26 2026
+
+Author: Rounak Meyur
+
+Description: Solvers for the minimum cost tension problem
+    min sum_e w_e |d_e - (p[tail_e] - p[head_e])|
+over integer node potentials p with p[root] = 0. The flat norm of a 1-current
+in a planar triangulation is of this form on the dual graph of the triangles.
+The solvers are
+    'cut'      -- combinatorial descent on the potentials, each step a
+                  minimum cut of the graph (maximum flow of scipy).
+    'highs'    -- the dual of the problem, the maximum cost circulation
+                      max sum_e d_e f_e  subject to  -w_e <= f_e <= w_e
+                  and zero divergence, as an LP for the HiGHS simplex. It is
+                  not a flow algorithm, only a smaller LP than the flat norm
+                  LP, with potentials read from its marginals.
+    'networkx' -- the same circulation by the network simplex of networkx,
+                  in pure python and slower than both.
+"""
+
+from __future__ import absolute_import
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse import csgraph
+from scipy.optimize import linprog
+import networkx as nx
+
+
+FLOW_METHOD = 'cut'
+
+def set_flow_method(method):
+    '''
+    Sets the method used by tension_solver when none is given in the call.
+    :param str method: one of the keys of FLOW_SOLVERS.
+    '''
+    global FLOW_METHOD
+    if method not in FLOW_SOLVERS:
+        raise ValueError(f"Unknown flow method {method}! Choose from {list(FLOW_SOLVERS)}")
+    FLOW_METHOD = method
+    return
+
+def residual_potentials(n_nodes, tails, heads, offsets, capacity, flow, root):
+    '''
+    Recovers optimal node potentials from an optimal circulation through
+    shortest paths on its residual graph. Every node is reached through a
+    virtual source with zero cost arcs, so nodes separated from the root by
+    saturated or zero capacity arcs also get feasible potentials.
+    :param int n_nodes: number of nodes.
+    :param int tails, heads: end nodes of the arcs.
+    :param int offsets: integer offsets d of the arcs.
+    :param capacity: capacities of the arcs in both directions.
+    :param flow: optimal flow on the arcs, positive from tail to head.
+    :param int root: node whose potential is fixed to zero.
+    :returns: integer potentials of the nodes.
+    '''
+    # the arc tail->head costs -d and can carry flow upto capacity
+    forward = flow < capacity
+    backward = flow > -capacity
+    rows = np.concatenate((tails[forward], heads[backward], np.full(n_nodes, n_nodes)))
+    cols = np.concatenate((heads[forward], tails[backward], np.arange(n_nodes)))
+    costs = np.concatenate((-offsets[forward], offsets[backward], np.zeros(n_nodes)))
+
+    # keep the cheapest of parallel residual arcs
+    order = np.lexsort((costs, cols, rows))
+    rows, cols, costs = rows[order], cols[order], costs[order]
+    first = np.ones(len(rows), dtype=bool)
+    first[1:] = (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])
+    graph = sparse.csr_matrix(
+        (costs[first].astype(float), (rows[first], cols[first])),
+        shape=(n_nodes + 1, n_nodes + 1))
+
+    dist = csgraph.bellman_ford(graph, directed=True, indices=n_nodes)
+    return np.rint(dist[:n_nodes] - dist[root]).astype(int)
+
+def flow_solver_networkx(n_nodes, tails, heads, offsets, weights, root, resolution=1e9):
+    '''
+    Combinatorial solver using the network simplex of networkx. The costs of
+    the circulation are the integer offsets, the capacities are the weights
+    scaled to integers with the given resolution.
+    '''
+    capacity = np.rint(weights * resolution).astype(np.int64)
+    graph = nx.MultiDiGraph()
+    graph.add_nodes_from(range(n_nodes))
+    arcs = np.flatnonzero(capacity > 0)
+    graph.add_edges_from(
+        (int(tails[i]), int(heads[i]), 2 * int(i),
+         {'weight': -int(offsets[i]), 'capacity': int(capacity[i])}) for i in arcs)
+    graph.add_edges_from(
+        (int(heads[i]), int(tails[i]), 2 * int(i) + 1,
+         {'weight': int(offsets[i]), 'capacity': int(capacity[i])}) for i in arcs)
+    _, flow_dict = nx.network_simplex(graph)
+
+    flow = np.zeros(len(tails), dtype=np.int64)
+    for i in arcs:
+        flow[i] = flow_dict[tails[i]][heads[i]][2 * i] - flow_dict[heads[i]][tails[i]][2 * i + 1]
+    return residual_potentials(n_nodes, tails, heads, offsets, capacity, flow, root)
+
+def flow_solver_highs(n_nodes, tails, heads, offsets, weights, root):
+    '''
+    Solver handing the circulation as an LP to the HiGHS simplex through
+    scipy. The LP has one row per node and one bounded variable per arc. The potentials are
+    the marginals of the conservation constraints, which are integral since
+    the incidence matrix is totally unimodular and the offsets are integers.
+    '''
+    n_arcs = len(tails)
+    arcs = np.arange(n_arcs)
+    incidence = sparse.csr_matrix(
+        (np.concatenate((np.ones(n_arcs), -np.ones(n_arcs))),
+         (np.concatenate((tails, heads)), np.concatenate((arcs, arcs)))),
+        shape=(n_nodes, n_arcs))
+    keep = np.flatnonzero(np.arange(n_nodes) != root)
+    sol = linprog(-offsets, A_eq=incidence[keep], b_eq=np.zeros(len(keep)),
+                  bounds=np.column_stack((-weights, weights)), method='highs')
+    if sol.status != 0:
+        raise ValueError(f"HiGHS failed to solve the circulation: {sol.message}")
+    potentials = np.zeros(n_nodes, dtype=int)
+    potentials[keep] = np.rint(-sol.eqlin.marginals).astype(int)
+    return potentials
+
+# largest capacity of the int32 maximum flow of scipy
+MAX_CAPACITY = np.iinfo(np.int32).max
+
+def tension_cost(tails, heads, offsets, weights, potentials):
+    return np.dot(weights, np.abs(offsets - (potentials[tails] - potentials[heads])))
+
+def min_cut_move(n_nodes, tails, heads, offsets, weights, potentials, root,
+                 resolution=1e9):
+    '''
+    Set X of nodes, without the root, minimizing the cost of the potentials
+    raised by one on X. With c = d - (p[tail] - p[head]) the cost of an arc
+    as a function of its end nodes lying in X is
+        w|c| - w x_tail + w x_head                    if c >= 1
+        w|c| + w x_tail - w x_head                    if c <= -1
+        w x_tail (1 - x_head) + w x_head (1 - x_tail)  if c = 0
+    which is a cut function: the nodes of X are the source side of a
+    minimum cut whose sink is the root. Only the arcs with c != 0, near the
+    current, join nodes to the source or the sink. The capacities are scaled
+    to the integers of the maximum flow of scipy.
+    :returns: bool array of the nodes in X.
+    '''
+    c = offsets - (potentials[tails] - potentials[heads])
+    tilted = c != 0
+    tail_term = np.where(c[tilted] >= 1, -weights[tilted], weights[tilted])
+    unary = np.bincount(tails[tilted], tail_term, n_nodes) \
+        - np.bincount(heads[tilted], tail_term, n_nodes)
+    unary[root] = 0
+    level = ~tilted & (weights > 0)
+    pair_tails = np.concatenate((tails[level], heads[level]))
+    pair_heads = np.concatenate((heads[level], tails[level]))
+    pair = pair_tails != root
+
+    # source is the extra node n_nodes, the root is the sink
+    source = n_nodes
+    nodes = np.arange(n_nodes)
+    rows = np.concatenate((nodes[unary > 0], np.full((unary < 0).sum(), source), pair_tails[pair]))
+    cols = np.concatenate((np.full((unary > 0).sum(), root), nodes[unary < 0], pair_heads[pair]))
+    caps = np.concatenate((unary[unary > 0], -unary[unary < 0],
+                           np.concatenate((weights[level], weights[level]))[pair]))
+    if len(caps) == 0:
+        return np.zeros(n_nodes, dtype=bool)
+    # the flow is at most the capacity leaving the source
+    bound = max(-unary[unary < 0].sum(), caps.max())
+    scale = min(resolution, MAX_CAPACITY / (2 * bound)) if bound > 0 else resolution
+    caps = np.rint(caps * scale)
+    keep = caps > 0
+    graph = sparse.csr_matrix(
+        (caps[keep].astype(np.int32), (rows[keep], cols[keep])),
+        shape=(n_nodes + 1, n_nodes + 1))
+
+    flow = csgraph.maximum_flow(graph, source, root).flow
+    residual = (graph - flow).tocsr()
+    residual.data = (residual.data > 0).astype(np.int8)
+    residual.eliminate_zeros()
+    reached = csgraph.breadth_first_order(residual, source, directed=True,
+                                          return_predecessors=False)
+    in_cut = np.zeros(n_nodes + 1, dtype=bool)
+    in_cut[reached] = True
+    return in_cut[:n_nodes]
+
+def flow_solver_cut(n_nodes, tails, heads, offsets, weights, root, max_iter=1000):
+    '''
+    Combinatorial solver by descent on the potentials. The cost of the
+    tension problem is L-natural convex in the integer potentials, so
+    potentials from which no set of nodes can be raised or lowered by one
+    at a lower cost are optimal (Murota, Discrete Convex Analysis). Every
+    step raises or lowers the best set, found as a minimum cut of the graph
+    itself with the maximum flow of scipy. The direction of the last step is
+    tried first and the other one only when it does not descend, and the
+    potentials are optimal when neither does. Starting from zero, the number
+    of steps is about the range of the potentials, a few for the flat norm.
+    '''
+    potentials = np.zeros(n_nodes, dtype=np.int64)
+    cost = tension_cost(tails, heads, offsets, weights, potentials)
+    sign, failed = 1, 0
+    for _ in range(max_iter):
+        # lowering the potentials is raising the negated potentials
+        moved = min_cut_move(n_nodes, tails, heads, sign * offsets, weights,
+                             sign * potentials, root)
+        trial = potentials + sign * moved
+        trial_cost = tension_cost(tails, heads, offsets, weights, trial)
+        if trial_cost < cost - 1e-12 * max(abs(cost), 1.0):
+            potentials, cost, failed = trial, trial_cost, 0
+            continue
+        failed += 1
+        if failed == 2:
+            return potentials.astype(int)
+        sign = -sign
+    raise ValueError(f"Descent on the potentials did not converge in {max_iter} steps!")
+
+FLOW_SOLVERS = {
+    'cut': flow_solver_cut,
+    'highs': flow_solver_highs,
+    'networkx': flow_solver_networkx,
+    }
+
+def tension_solver(n_nodes, tails, heads, offsets, weights, root=0, method=None):
+    '''
+    Minimum cost tension solver.
+    :param int n_nodes: number of nodes.
+    :param int tails: a vector of tail nodes of the arcs.
+    :param int heads: a vector of head nodes of the arcs.
+    :param int offsets: a vector of integer offsets d of the arcs.
+    :param float weights: a vector of non-negative costs w of the arcs.
+    :param int root: node whose potential is fixed to zero.
+    :param str method: the solver to use, one of the keys of FLOW_SOLVERS.
+        Defaults to FLOW_METHOD which can be changed with set_flow_method.
+    :returns: potentials -- optimal integer potentials of the nodes.
+    :rtype: int
+    '''
+    if not method:
+        method = FLOW_METHOD
+    if method not in FLOW_SOLVERS:
+        raise ValueError(f"Unknown flow method {method}! Choose from {list(FLOW_SOLVERS)}")
+
+    tails = np.asarray(tails, dtype=np.int64)
+    heads = np.asarray(heads, dtype=np.int64)
+    offsets = np.asarray(offsets, dtype=float)
+    if not np.array_equal(offsets, np.rint(offsets)):
+        raise ValueError("Offsets of the tension problem must be integers!")
+    offsets = np.rint(offsets).astype(np.int64)
+
+    # the solvers use absolute tolerances, so the weights are scaled to unit maximum
+    weights = np.abs(np.asarray(weights, dtype=float))
+    scale = weights.max(initial=0) or 1.0
+    return FLOW_SOLVERS[method](n_nodes, tails, heads, offsets, weights / scale, root)
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 22:05:41 2026
+
+Author: Rounak Meyur
+
+Description: Geodesic distances on the WGS84 ellipsoid between arrays of
+(longitude, latitude) coordinates. The distances of all pairs are computed in
+one call, with a selectable method:
+    'karney'    -- exact geodesic of Karney (geographiclib algorithm, through
+                   the C implementation of pyproj), accurate to nanometers.
+    'vincenty'  -- iterative ellipsoidal formula of Vincenty, accurate to
+                   fractions of a millimeter.
+    'haversine' -- great circle distance on a sphere of the mean radius, with
+                   an error upto about 0.5%.
+    'flat'      -- tangent plane approximation with the radii of curvature of
+                   the ellipsoid at the mean latitude, accurate for the short
+                   segments of the networks.
+It also holds the Lambert azimuthal equal-area projection of the ellipsoid to
+a local frame in meters around an origin, in which the regions are
+triangulated and the lengths and areas of the flat norm are measured.
+"""
+
+import numpy as np
+import shapely
+from pyproj import Geod
+
+
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = WGS84_A * (1 - WGS84_F)
+MEAN_RADIUS = 6371008.8
+
+GEODESIC_METHODS = ('karney', 'vincenty', 'haversine', 'flat')
+
+GEOD = Geod(ellps='WGS84')
+
+def karney(lon1, lat1, lon2, lat2):
+    return GEOD.inv(lon1, lat1, lon2, lat2)[2]
+
+def haversine(lon1, lat1, lon2, lat2):
+    lon1, lat1, lon2, lat2 = map(np.radians, (lon1, lat1, lon2, lat2))
+    h = np.sin((lat2 - lat1) / 2) ** 2 \
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * MEAN_RADIUS * np.arcsin(np.sqrt(np.clip(h, 0, 1)))
+
+def flat(lon1, lat1, lon2, lat2):
+    phi = np.radians((lat1 + lat2) / 2)
+    e2 = WGS84_F * (2 - WGS84_F)
+    w2 = 1 - e2 * np.sin(phi) ** 2
+    # meridional and prime vertical radii of curvature
+    M = WGS84_A * (1 - e2) / w2 ** 1.5
+    N = WGS84_A / np.sqrt(w2)
+    dlon = np.radians((lon2 - lon1 + 180) % 360 - 180)
+    return np.hypot(M * np.radians(lat2 - lat1), N * np.cos(phi) * dlon)
+
+def vincenty(lon1, lat1, lon2, lat2, tol=1e-12, max_iter=200):
+    '''
+    Vectorized inverse formula of Vincenty. The pairs for which the iteration
+    does not converge, nearly antipodal points, are computed with karney.
+    '''
+    lon1, lat1, lon2, lat2 = np.broadcast_arrays(
+        *[np.asarray(x, dtype=float) for x in (lon1, lat1, lon2, lat2)])
+    a, b, f = WGS84_A, WGS84_B, WGS84_F
+    L = np.radians(lon2 - lon1)
+    U1 = np.arctan((1 - f) * np.tan(np.radians(lat1)))
+    U2 = np.arctan((1 - f) * np.tan(np.radians(lat2)))
+    sinU1, cosU1 = np.sin(U1), np.cos(U1)
+    sinU2, cosU2 = np.sin(U2), np.cos(U2)
+
+    lam = L.copy()
+    converged = np.zeros(L.shape, dtype=bool)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for _ in range(max_iter):
+            sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+            sin_sigma = np.hypot(cosU2 * sin_lam, cosU1 * sinU2 - sinU1 * cosU2 * cos_lam)
+            cos_sigma = sinU1 * sinU2 + cosU1 * cosU2 * cos_lam
+            sigma = np.arctan2(sin_sigma, cos_sigma)
+            sin_alpha = np.where(sin_sigma == 0, 0.0,
+                                 cosU1 * cosU2 * sin_lam / sin_sigma)
+            cos2_alpha = 1 - sin_alpha ** 2
+            # equatorial lines have cos2_alpha = 0
+            cos_2sm = np.where(cos2_alpha == 0, 0.0,
+                               cos_sigma - 2 * sinU1 * sinU2 / cos2_alpha)
+            C = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+            lam_prev = lam
+            lam = L + (1 - C) * f * sin_alpha * (
+                sigma + C * sin_sigma * (cos_2sm + C * cos_sigma * (-1 + 2 * cos_2sm ** 2)))
+            converged = np.abs(lam - lam_prev) <= tol
+            if converged.all():
+                break
+
+        u2 = cos2_alpha * (a ** 2 - b ** 2) / b ** 2
+        A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+        B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+        delta_sigma = B * sin_sigma * (cos_2sm + B / 4 * (
+            cos_sigma * (-1 + 2 * cos_2sm ** 2)
+            - B / 6 * cos_2sm * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sm ** 2)))
+        s = b * A * (sigma - delta_sigma)
+
+    failed = ~converged | ~np.isfinite(s)
+    if failed.any():
+        s = np.array(s, dtype=float)
+        s[failed] = karney(lon1[failed], lat1[failed], lon2[failed], lat2[failed])
+    return s
+
+DISTANCE = {'karney': karney, 'vincenty': vincenty,
+            'haversine': haversine, 'flat': flat}
+
+def distance(pts1, pts2, method='karney'):
+    '''
+    Geodesic distances in meters between two arrays of points.
+    :param pts1, pts2: arrays of (longitude, latitude) coordinates of shape
+        (...,2), broadcast against each other.
+    :param method: one of GEODESIC_METHODS.
+    :returns: array of the distances of shape of the broadcast points.
+    '''
+    if method not in DISTANCE:
+        raise ValueError(f"Unknown geodesic method {method}, use one of {GEODESIC_METHODS}!")
+    pts1, pts2 = np.broadcast_arrays(np.asarray(pts1, dtype=float),
+                                     np.asarray(pts2, dtype=float))
+    if pts1.shape[-1] != 2:
+        raise ValueError("The points must be (longitude, latitude) pairs!")
+    shape = pts1.shape[:-1]
+    if pts1.size == 0:
+        return np.zeros(shape)
+    pts1, pts2 = pts1.reshape(-1, 2), pts2.reshape(-1, 2)
+    dist = DISTANCE[method](pts1[:, 0], pts1[:, 1], pts2[:, 0], pts2[:, 1])
+    return np.asarray(dist, dtype=float).reshape(shape)
+
+def segment_lengths(geometry, method='karney'):
+    '''
+    Geodesic lengths of every pair of consecutive coordinates of a list of
+    line geometries.
+    :returns: lengths, owner -- the length of every segment and the index of
+        the geometry it belongs to.
+    '''
+    if len(geometry) == 0:
+        return np.zeros(0), np.zeros(0, dtype=int)
+    coords, index = shapely.get_coordinates(geometry, return_index=True)
+    same = index[1:] == index[:-1]
+    lengths = distance(coords[:-1][same], coords[1:][same], method=method)
+    return lengths, index[:-1][same]
+
+def geodesic_length(geometry, method='karney'):
+    '''
+    Geodesic length in meters of every line geometry of a list.
+    '''
+    lengths, owner = segment_lengths(geometry, method=method)
+    return np.bincount(owner, weights=lengths, minlength=len(geometry))
+
+
+def authalic_q(phi):
+    e2 = WGS84_F * (2 - WGS84_F)
+    e = np.sqrt(e2)
+    sin_phi = np.sin(phi)
+    return (1 - e2) * (sin_phi / (1 - e2 * sin_phi ** 2)
+                       - np.log((1 - e * sin_phi) / (1 + e * sin_phi)) / (2 * e))
+
+def laea_constants(origin):
+    '''
+    Constants of the oblique Lambert azimuthal equal-area projection of the
+    WGS84 ellipsoid centered at origin (Snyder, Map Projections, p. 187).
+    '''
+    lon0, lat0 = origin
+    e2 = WGS84_F * (2 - WGS84_F)
+    phi1 = np.radians(lat0)
+    qp = authalic_q(np.pi / 2)
+    Rq = WGS84_A * np.sqrt(qp / 2)
+    beta1 = np.arcsin(authalic_q(phi1) / qp)
+    m1 = np.cos(phi1) / np.sqrt(1 - e2 * np.sin(phi1) ** 2)
+    D = WGS84_A * m1 / (Rq * np.cos(beta1))
+    return np.radians(lon0), beta1, qp, Rq, D
+
+def project_laea(coords, origin):
+    '''
+    Lambert azimuthal equal-area coordinates in meters of (longitude,
+    latitude) points. Areas are exact and lengths are scaled by less than
+    1e-9 within a kilometer of the origin.
+    :param coords: array of points of shape (...,2).
+    :param origin: (longitude, latitude) of the center of the frame.
+    :returns: array of (x, y) of the shape of coords.
+    '''
+    coords = np.asarray(coords, dtype=float)
+    lam0, beta1, qp, Rq, D = laea_constants(origin)
+    lam = np.radians(coords[..., 0]) - lam0
+    beta = np.arcsin(np.clip(authalic_q(np.radians(coords[..., 1])) / qp, -1, 1))
+    B = Rq * np.sqrt(2 / (1 + np.sin(beta1) * np.sin(beta)
+                          + np.cos(beta1) * np.cos(beta) * np.cos(lam)))
+    x = B * D * np.cos(beta) * np.sin(lam)
+    y = (B / D) * (np.cos(beta1) * np.sin(beta)
+                   - np.sin(beta1) * np.cos(beta) * np.cos(lam))
+    return np.stack((x, y), axis=-1)
+
+def unproject_laea(xy, origin):
+    '''
+    Inverse of project_laea.
+    '''
+    xy = np.asarray(xy, dtype=float)
+    lam0, beta1, qp, Rq, D = laea_constants(origin)
+    x, y = xy[..., 0], xy[..., 1]
+    rho = np.hypot(x / D, D * y)
+    ce = 2 * np.arcsin(np.clip(rho / (2 * Rq), -1, 1))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        beta = np.where(rho == 0, beta1, np.arcsin(np.clip(
+            np.cos(ce) * np.sin(beta1) + D * y * np.sin(ce) * np.cos(beta1) / rho, -1, 1)))
+    lam = lam0 + np.arctan2(x * np.sin(ce), D * rho * np.cos(beta1) * np.cos(ce)
+                            - D ** 2 * y * np.sin(beta1) * np.sin(ce))
+    # latitude from the authalic latitude
+    e2 = WGS84_F * (2 - WGS84_F)
+    phi = beta + (e2 / 3 + 31 * e2 ** 2 / 180 + 517 * e2 ** 3 / 5040) * np.sin(2 * beta) \
+        + (23 * e2 ** 2 / 360 + 251 * e2 ** 3 / 3780) * np.sin(4 * beta) \
+        + (761 * e2 ** 3 / 45360) * np.sin(6 * beta)
+    # refine the series by Newton steps on authalic_q
+    q = qp * np.sin(beta)
+    e = np.sqrt(e2)
+    for _ in range(2):
+        sin_phi = np.sin(phi)
+        w = 1 - e2 * sin_phi ** 2
+        phi = phi + w ** 2 / (2 * np.cos(phi)) * (
+            q / (1 - e2) - sin_phi / w
+            + np.log((1 - e * sin_phi) / (1 + e * sin_phi)) / (2 * e))
+    return np.stack((np.degrees(lam), np.degrees(phi)), axis=-1)
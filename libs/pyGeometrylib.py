@@ -5,9 +5,10 @@ Created on Thu Jan 21 15:34:56 2021
 @author: rouna
 """
 
+import shapely
 from shapely.geometry import Point,LineString,Polygon
-from geographiclib.geodesic import Geodesic
 import numpy as np
+from libs.pyGeodesiclib import GEOD, geodesic_length
 
 #%% Class Link to define network geometry
 class Link(LineString):
@@ -30,14 +31,8 @@ class Link(LineString):
         if self.geom_type != 'LineString':
             print("Cannot compute length!!!")
             return None
-        # Compute great circle distance
-        geod = Geodesic.WGS84
-        length = 0.0
-        for i in range(len(list(self.coords))-1):
-            lon1,lon2 = self.xy[0][i:i+2]
-            lat1,lat2 = self.xy[1][i:i+2]
-            length += geod.Inverse(lat1, lon1, lat2, lon2)['s12']
-        return length
+        # Compute geodesic length of all the pieces at once
+        return geodesic_length([self])[0]
     
     def InterpolatePoints(self,sep=20):
         """
@@ -85,14 +80,62 @@ def MeasureDistance(pt1,pt2):
     '''
     lon1,lat1 = pt1
     lon2,lat2 = pt2
-    geod = Geodesic.WGS84
-    return geod.Inverse(lat1, lon1, lat2, lon2)['s12']
+    return GEOD.inv(lon1, lat1, lon2, lat2)[2]
 
 def geodist(geomA,geomB):
-    if type(geomA) != Point: geomA = Point(geomA)
-    if type(geomB) != Point: geomB = Point(geomB)
-    geod = Geodesic.WGS84
-    return geod.Inverse(geomA.y, geomA.x, geomB.y, geomB.x)['s12']
+    '''
+    Geodesic distance between two points or (longitude,latitude) pairs. Use
+    pyGeodesiclib.distance for arrays of points.
+    '''
+    if type(geomA) == Point: geomA = (geomA.x,geomA.y)
+    if type(geomB) == Point: geomB = (geomB.x,geomB.y)
+    return GEOD.inv(geomA[0], geomA[1], geomB[0], geomB[1])[2]
+    
+def get_vertex_index(coords,tol=None):
+    """
+    Deduplicates an array of coordinates by hashing them on a grid.
+    coords: array of shape (n,2) with the coordinates.
+    tol: grid spacing used to quantize the coordinates, None for exact matches.
+    Returns the unique vertices in order of first appearance and the index of
+    the vertex for every input coordinate.
+    """
+    coords = np.asarray(coords,dtype=float).reshape(-1,2)
+    if tol:
+        keys = np.floor(coords/tol + 0.5).astype(np.int64)
+    else:
+        keys = coords
+    _,first,inverse = np.unique(keys,axis=0,return_index=True,return_inverse=True)
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return coords[first[order]], rank[inverse.ravel()]
+
+def get_coord_structure(segments,tol=None):
+    """
+    Builds the vertex and segment structure from an array of line segments.
+    segments: array of shape (n,2,2) with the end coordinates of each segment.
+    tol: grid spacing used to merge vertices, None for exact matches.
+    """
+    segments = np.asarray(segments,dtype=float)
+    if segments.size == 0:
+        return {'vertices':np.array([]), 'segments':np.array([])}
+    vertices,index = get_vertex_index(segments.reshape(-1,2),tol=tol)
+    return {'vertices':vertices, 'segments':index.reshape(-1,2)}
+
+def get_structure(geometry,tol=None):
+    """
+    Builds the vertex and segment structure from a list of line segments.
+    Every coordinate of the geometries becomes a vertex and every geometry a
+    segment between its first two coordinates.
+    """
+    if len(geometry) == 0:
+        return {'vertices':np.array([]), 'segments':np.array([])}
+    coords = shapely.get_coordinates(geometry)
+    start = np.cumsum(shapely.get_num_coordinates(geometry)) \
+        - shapely.get_num_coordinates(geometry)
+    vertices,index = get_vertex_index(coords,tol=tol)
+    segments = np.column_stack((index[start],index[start+1]))
+    return {'vertices':vertices, 'segments':segments}
     
 def partitions(limits,kx,ky,x0=0,y0=0):
     """
@@ -6,39 +6,61 @@ Created on Thu Oct 20 15:29:36 2022
 """
 
 from pygeodesy import hausdorff_, hypot
+import shapely
 from shapely.geometry import Point, LineString
 import numpy as np
-from geographiclib.geodesic import Geodesic
+from scipy.spatial import cKDTree
+from shapely import STRtree
+from libs.pyGeometrylib import geodist
+from libs.pyGeodesiclib import distance as geodesic_distance, geodesic_length
+from libs.pyGeodesiclib import project_laea, unproject_laea
 
-def geodist(geomA,geomB):
-    if type(geomA) != Point: geomA = Point(geomA)
-    if type(geomB) != Point: geomB = Point(geomB)
-    geod = Geodesic.WGS84
-    return geod.Inverse(geomA.y, geomA.x, geomB.y, geomB.x)['s12']
+HAUSDORFF_METHODS = ('kdtree', 'segment', 'pygeodesy')
 
 def euclid_dist(geomA,geomB):
     if type(geomA) != Point: geomA = Point(geomA)
     if type(geomB) != Point: geomB = Point(geomB)
     return hypot((geomA.x-geomB.x),(geomA.y-geomB.y))
 
-def interpolate_points(geometry,sep=10):
-    points = []
+def densify(geometry,sep=10,return_owner=False):
+    '''
+    Points along every line segment at a geodesic separation of sep meters,
+    starting from the first end. The end points of segments shorter than
+    sep are taken. The lengths of all segments are computed in one call and
+    all the points interpolated in another.
+    :param return_owner: also return the index of the segment of every point.
+        The points of a segment are consecutive, so the points of a subset of
+        the segments are the same as the points of the subset densified.
+    :returns: array of dimension (nx2) of the points.
+    '''
     if not isinstance(geometry, list):
         geometry = [geometry]
-    
-    # iterate over each linestring geometry
-    for geom in geometry:
-        new_points = []
-        length = geodist(geom.coords[0],geom.coords[1])
-        for i in np.arange(0,length,sep):
-            x,y = geom.interpolate(i/length,normalized=True).xy
-            new_points.append((x[0],y[0]))
-        if len(new_points)==0:
-            new_points.extend([(geom.coords[0]),(geom.coords[1])])
-        
-        # Extend the points list
-        points.extend(new_points)
-    return points
+    if len(geometry) == 0:
+        return (np.empty((0,2)), np.empty(0, dtype=int)) if return_owner else np.empty((0,2))
+    geometry = np.array(geometry, dtype=object)
+    ends = shapely.get_coordinates(shapely.get_point(geometry, 0)), \
+        shapely.get_coordinates(shapely.get_point(geometry, 1))
+    length = geodesic_distance(*ends)
+
+    # number of points of each segment, as many as np.arange(0,length,sep)
+    count = np.ceil(length/sep).astype(int)
+    owner = np.repeat(np.arange(len(geometry)), count)
+    step = np.arange(len(owner)) - np.repeat(np.cumsum(count)-count, count)
+    fraction = (step*sep)/length[owner]
+    inner = shapely.get_coordinates(
+        shapely.line_interpolate_point(geometry[owner], fraction, normalized=True))
+
+    # segments without points are represented by both ends
+    short = np.flatnonzero(count == 0)
+    coords = np.concatenate((inner, ends[0][short], ends[1][short]))
+    order = np.concatenate((owner, short, short))
+    sort = np.argsort(order, kind='stable')
+    if return_owner:
+        return coords[sort], order[sort]
+    return coords[sort]
+
+def interpolate_points(geometry,sep=10):
+    return [tuple(c) for c in densify(geometry, sep=sep)]
 
 def compute_length(geometry, distance="euclidean"):
     if not isinstance(geometry, list):
@@ -46,12 +68,216 @@ def compute_length(geometry, distance="euclidean"):
     if distance == "euclidean":
         length = sum([geom.length for geom in geometry])
     elif distance == "geodesic":
-        length = sum([geodist(geom.coords[0],geom.coords[1]) \
-                      for geom in geometry])
+        length = geodesic_length(geometry).sum()
     return length
 
+def get_frame_origin(*coords):
+    '''
+    Center of the bounding box of arrays of (longitude,latitude) points, the
+    origin of the local metric frame of geodesic Hausdorff distances.
+    '''
+    coords = np.concatenate([np.asarray(c).reshape(-1,2) for c in coords])
+    return tuple((coords.min(axis=0) + coords.max(axis=0)) / 2)
+
+def directed_hausdorff(points, target, tree=None):
+    '''
+    Directed Hausdorff distance from a set of points to another, the largest
+    distance of a point to its nearest neighbour in the target.
+    :param tree: cKDTree of the target, built if not given.
+    :returns: hd, i, j -- the distance, the index of the farthest point and
+        of its nearest neighbour in the target.
+    '''
+    tree = tree if tree is not None else cKDTree(target)
+    dist, index = tree.query(points)
+    i = int(np.argmax(dist))
+    return dist[i], i, int(index[i])
+
+def select_points(points, offsets, index):
+    '''
+    Points of a subset of the segments of a densified network.
+    :param offsets: position of the first point of every segment and the
+        number of points, see densify with return_owner.
+    :param index: sorted indices of the segments.
+    '''
+    index = np.asarray(index, dtype=int)
+    start = offsets[index]
+    count = offsets[index + 1] - start
+    take = np.repeat(start - np.cumsum(count) + count, count) + np.arange(count.sum())
+    return points[take]
+
+def prepare_points(points, distance="euclidean", origin=None):
+    '''
+    Densified points of a network with their coordinates in the frame of the
+    distance and their KD-tree, to be reused for many Hausdorff distances.
+    :param origin: center of the local metric frame of geodesic distances.
+    :returns: points, xy, tree
+    '''
+    points = np.asarray(points, dtype=float).reshape(-1,2)
+    xy = project_laea(points, origin) if distance == "geodesic" else points
+    return points, xy, cKDTree(xy)
+
+def hausdorff_prepared(act, synt, distance="euclidean"):
+    '''
+    Hausdorff distance between two sets of prepared points, see
+    prepare_points, measured between the farthest point and its nearest
+    point on the other network.
+    :returns: hd, (p, q) -- the distance and the two points.
+    '''
+    act_pts, act_xy, act_tree = act
+    synt_pts, synt_xy, synt_tree = synt
+    hd1,i1,j1 = directed_hausdorff(act_xy, synt_xy, tree=synt_tree)
+    hd2,i2,j2 = directed_hausdorff(synt_xy, act_xy, tree=act_tree)
+    if hd1 >= hd2:
+        pair = act_pts[i1], synt_pts[j1]
+    else:
+        pair = synt_pts[i2], act_pts[j2]
+    return pair_distance(pair, distance), pair
+
+def pair_distance(pair, distance="euclidean"):
+    if distance == "geodesic":
+        return float(geodesic_distance(*pair))
+    return float(np.hypot(*(pair[1] - pair[0])))
+
+def get_segment_arrays(geometry):
+    '''
+    Start and end points of the pieces between consecutive coordinates of a
+    list of line geometries.
+    '''
+    if len(geometry) == 0:
+        return np.empty((0,2)), np.empty((0,2))
+    coords, index = shapely.get_coordinates(geometry, return_index=True)
+    same = index[1:] == index[:-1]
+    return coords[:-1][same], coords[1:][same]
+
+def nearest_on_segments(points, start, end):
+    '''
+    Distance of every point to the segment of the same row, and the nearest
+    point on the segment.
+    :returns: dist, nearest -- arrays of dimension (n) and (nx2).
+    '''
+    direction = end - start
+    norm2 = (direction**2).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = np.where(norm2 > 0, ((points - start)*direction).sum(axis=1)/norm2, 0.0)
+    nearest = start + np.clip(t, 0, 1)[:,None]*direction
+    return np.hypot(*(points - nearest).T), nearest
+
+def get_segment_tree(start, end):
+    return STRtree(shapely.linestrings(np.stack((start, end), axis=1)))
+
+def directed_segment_hausdorff(start, end, target_start, target_end,
+                               rtol=1e-9, lower=0.0, tree=None):
+    '''
+    Directed Hausdorff distance from a set of segments to another, computed
+    exactly without densification by a branch and bound over intervals of
+    the segments. The nearest target segment of a point is found with an
+    STRtree of the target. The distance f(p) of a point to the target is
+    1-Lipschitz, and on an interval it is at most the larger distance of the
+    two ends to the nearest target segment of either end, as the distance to
+    a segment is convex. Intervals whose bound does not exceed the largest
+    distance found, or lower, are dropped and the others are bisected, so
+    that the cost follows the number of segments near the farthest points
+    and not the length of the networks.
+    :param lower: known lower bound of the result, such as the distance in
+        the other direction.
+    :param tree: STRtree of the target segments, see get_segment_tree.
+    :returns: hd, p, q -- the distance, the point on the segments and its
+        nearest point on the target segments. If no point is farther than
+        lower, the farthest point found.
+    '''
+    tree = tree if tree is not None else get_segment_tree(target_start, target_end)
+    span = np.ptp(np.concatenate((start, end, target_start, target_end)), axis=0).max()
+    atol = rtol * span
+
+    def nearest(points):
+        index = tree.query_nearest(shapely.points(points), all_matches=False)
+        seg = np.empty(len(points), dtype=int)
+        seg[index[0]] = index[1]
+        dist, near = nearest_on_segments(points, target_start[seg], target_end[seg])
+        return dist, near, seg
+
+    def update(best, dist, near, points):
+        k = int(np.argmax(dist))
+        if best is None or dist[k] > best[0]:
+            return dist[k], points[k], near[k]
+        return best
+
+    p0, p1 = start, end
+    f0, n0, j0 = nearest(p0)
+    f1, n1, j1 = nearest(p1)
+    best = update(update(None, f0, n0, p0), f1, n1, p1)
+    while len(p0):
+        # bound the distance on every interval
+        length = np.hypot(*(p1 - p0).T)
+        upper = np.minimum.reduce((
+            (f0 + f1 + length)/2,
+            np.maximum(f0, nearest_on_segments(p1, target_start[j0], target_end[j0])[0]),
+            np.maximum(f1, nearest_on_segments(p0, target_start[j1], target_end[j1])[0])))
+        keep = upper > max(best[0], lower)*(1 + rtol) + atol
+        p0, p1, f0, f1, j0, j1 = p0[keep], p1[keep], f0[keep], f1[keep], j0[keep], j1[keep]
+        if not len(p0):
+            break
+
+        # bisect the remaining intervals
+        pm = (p0 + p1)/2
+        fm, nm, jm = nearest(pm)
+        best = update(best, fm, nm, pm)
+        p0, p1 = np.concatenate((p0, pm)), np.concatenate((pm, p1))
+        f0, f1 = np.concatenate((f0, fm)), np.concatenate((fm, f1))
+        j0, j1 = np.concatenate((j0, jm)), np.concatenate((jm, j1))
+    return best
+
+def compute_hausdorff(act_geom, synt_geom, distance="euclidean", method="kdtree", sep=10,
+                      origin=None):
+    '''
+    Hausdorff distance between the actual and synthetic network segments.
+    :param distance: "euclidean" in degrees, or "geodesic" in meters.
+    :param method: 'kdtree' densifies the segments every sep meters and finds
+        the nearest points with KD-trees, geodesic distances in the local
+        metric frame of the networks. 'segment' is exact, computed from the
+        segments without densification, with a cost proportional to the number
+        of segments instead of their length. 'pygeodesy' is the reference pairwise
+        search of the densified points.
+    :param origin: center of the local metric frame, by default the center
+        of the networks.
+    :returns: hd, hd_geom -- the distance and the line from the farthest point
+        to its nearest point on the other network. The geodesic distance is
+        measured on the ellipsoid between these two points.
+    '''
+    if method not in HAUSDORFF_METHODS:
+        raise ValueError(f"Unknown Hausdorff method {method}, use one of {HAUSDORFF_METHODS}!")
+    if distance not in ("euclidean", "geodesic"):
+        raise ValueError(f"Unknown distance {distance}, use 'euclidean' or 'geodesic'!")
+    if len(act_geom) == 0 or len(synt_geom) == 0:
+        raise ValueError("Hausdorff distance of an empty network!")
+    if method == "pygeodesy":
+        return compute_hausdorff_pairwise(act_geom, synt_geom, distance=distance)
+
+    if method == "kdtree":
+        act_pts, synt_pts = densify(act_geom, sep=sep), densify(synt_geom, sep=sep)
+        origin = origin or get_frame_origin(act_pts, synt_pts)
+        hd, pair = hausdorff_prepared(prepare_points(act_pts, distance, origin),
+                                      prepare_points(synt_pts, distance, origin),
+                                      distance=distance)
+        return hd, LineString((Point(pair[0]), Point(pair[1])))
+
+    elif method == "segment":
+        act_seg, synt_seg = get_segment_arrays(act_geom), get_segment_arrays(synt_geom)
+        origin = origin or get_frame_origin(*act_seg, *synt_seg)
+        if distance == "geodesic":
+            act_seg = tuple(project_laea(s, origin) for s in act_seg)
+            synt_seg = tuple(project_laea(s, origin) for s in synt_seg)
+        hd1,p1,q1 = directed_segment_hausdorff(*act_seg, *synt_seg)
+        # the other direction only searches for distances larger than hd1
+        hd2,p2,q2 = directed_segment_hausdorff(*synt_seg, *act_seg, lower=hd1)
+        pair = (p1, q1) if hd1 >= hd2 else (p2, q2)
+        if distance == "geodesic":
+            pair = tuple(unproject_laea(p, origin) for p in pair)
+
+    pair = tuple(np.asarray(p, dtype=float) for p in pair)
+    return pair_distance(pair, distance), LineString((Point(pair[0]), Point(pair[1])))
 
-def compute_hausdorff(act_geom, synt_geom, distance="euclidean"):
+def compute_hausdorff_pairwise(act_geom, synt_geom, distance="euclidean"):
     act_geom_pts = interpolate_points(act_geom)
     synt_geom_pts = interpolate_points(synt_geom)
     # check_hausdorff(act_geom_pts, synt_geom_pts)
@@ -67,10 +293,10 @@ def compute_hausdorff(act_geom, synt_geom, distance="euclidean"):
                                   distance=geodist)
     if hd1 >= hd2:
         hd = hd1
-        hd_geom = LineString((Point(act_geom_pts[i1]), 
+        hd_geom = LineString((Point(act_geom_pts[i1]),
                               Point(synt_geom_pts[j1])))
     else:
         hd = hd2
-        hd_geom = LineString((Point(synt_geom_pts[i2]), 
+        hd_geom = LineString((Point(synt_geom_pts[i2]),
                               Point(act_geom_pts[j2])))
     return hd, hd_geom
@@ -9,33 +9,176 @@ from __future__ import absolute_import
 
 import numpy as np
 from scipy import sparse
+from scipy.optimize import linprog
 
 
 from cvxopt import matrix, spmatrix, solvers
 
+try:
+    import highspy
+except ImportError:
+    highspy = None
+
 solvers.options['abstol'] = 1e-10
 solvers.options['reltol'] = 1e-9
 solvers.options['feastol'] = 1e-10
 solvers.options['show_progress'] = False
 
-def lp_solver(c, cons, b):
+LP_BACKEND = 'glpk'
+
+def set_lp_backend(backend):
     '''
-    Linear program solver. 
-    :param float c: a vector of cost coefficients for the objective function.
-    :param int cons: a constraint matrix A of dimension kmx(2m+k(2m+2n)).
-    :param int b: a vector of coefficients.
-    :returns: sol_x, objective_value -- the optimal solution and objective value resp.
-    :rtype: int, float
+    Sets the backend used by lp_solver when none is given in the call.
+    :param str backend: one of the keys of LP_SOLVERS.
     '''
+    global LP_BACKEND
+    if backend not in LP_SOLVERS:
+        raise ValueError(f"Unknown LP backend {backend}! Choose from {list(LP_SOLVERS)}")
+    LP_BACKEND = backend
+    return
+
+def lp_solver_glpk(c, cons, b, inequality=False):
+    '''
+    Linear program solver using the GLPK simplex through cvxopt.
+    Non-negativity of the variables is imposed as the inequality -Ix <= 0.
+    For inequality constraints cons x >= b the rows -cons x <= -b are
+    stacked on top of it.
+    '''
+    b = np.asarray(b, dtype=float).ravel()
     g = -sparse.identity(len(c), dtype=np.int8, format='coo')
     h = np.zeros(len(c))
+    if inequality:
+        g = sparse.vstack((-sparse.coo_matrix(cons), g), format='coo')
+        h = np.concatenate((-b, h))
     G = spmatrix(g.data.tolist(), g.row, g.col, g.shape,  tc='d')
     h = matrix(h)
     c = matrix(c)
-    cons = spmatrix(cons.data.tolist(), cons.row, cons.col, cons.shape, tc='d')
-    b = matrix(b,(len(b),1),'d')
-    sol = solvers.lp(c, G, h, cons, b, solver='glpk',
-                    options={'glpk':{'msg_lev':'GLP_MSG_OFF'}})
+    if inequality:
+        sol = solvers.lp(c, G, h, solver='glpk',
+                        options={'glpk':{'msg_lev':'GLP_MSG_OFF'}})
+    else:
+        cons = sparse.coo_matrix(cons)
+        cons = spmatrix(cons.data.tolist(), cons.row, cons.col, cons.shape, tc='d')
+        b = matrix(b,(len(b),1),'d')
+        sol = solvers.lp(c, G, h, cons, b, solver='glpk',
+                        options={'glpk':{'msg_lev':'GLP_MSG_OFF'}})
     sol_x = np.array(sol['x'])
     objective_value = sol['primal objective']
-    return sol_x, objective_value
\ No newline at end of file
+    return sol_x, objective_value
+
+def lp_solver_highs(c, cons, b, inequality=False):
+    '''
+    Linear program solver using HiGHS through scipy.
+    The sparse constraint matrix is handed over as is and non-negativity of
+    the variables is imposed through variable bounds.
+    '''
+    b = np.asarray(b, dtype=float).ravel()
+    if inequality:
+        sol = linprog(c, A_ub=-sparse.csr_matrix(cons), b_ub=-b,
+                      bounds=(0, None), method='highs')
+    else:
+        sol = linprog(c, A_eq=cons, b_eq=b,
+                      bounds=(0, None), method='highs')
+    if sol.status != 0:
+        raise ValueError(f"HiGHS failed to solve the linear program: {sol.message}")
+    sol_x = sol.x.reshape(-1, 1)
+    objective_value = sol.fun
+    return sol_x, objective_value
+
+LP_SOLVERS = {
+    'glpk': lp_solver_glpk,
+    'highs': lp_solver_highs,
+    }
+
+def lp_solver(c, cons, b, backend=None, inequality=False):
+    '''
+    Linear program solver. 
+    :param float c: a vector of cost coefficients for the objective function.
+    :param int cons: a constraint matrix A of dimension kmx(2m+k(2m+2n)).
+    :param int b: a vector of coefficients.
+    :param str backend: the solver to use, one of the keys of LP_SOLVERS.
+        Defaults to LP_BACKEND which can be changed with set_lp_backend.
+    :param bool inequality: solve for cons x >= b instead of cons x = b.
+    :returns: sol_x, objective_value -- the optimal solution and objective value resp.
+    :rtype: int, float
+    '''
+    if not backend:
+        backend = LP_BACKEND
+    if backend not in LP_SOLVERS:
+        raise ValueError(f"Unknown LP backend {backend}! Choose from {list(LP_SOLVERS)}")
+
+    # the solvers use absolute optimality tolerances, so the costs (lengths
+    # and areas in radians) are scaled to unit maximum before solving
+    c = np.asarray(c, dtype=float).ravel()
+    scale = np.abs(c).max(initial=0) or 1.0
+    sol_x, objective_value = LP_SOLVERS[backend](c / scale, cons, b,
+                                                 inequality=inequality)
+    return sol_x, objective_value * scale
+
+
+class LPSequence:
+    """
+    Solves a sequence of linear programs min cx, cons x = b, x >= 0 which
+    differ only in the cost vector c. With the highs backend and highspy
+    installed a single HiGHS model is built and every solve is warm started
+    from the optimal basis of the previous one. Otherwise every solve is a
+    cold call to lp_solver.
+    """
+    def __init__(self, cons, b, backend=None):
+        if not backend:
+            backend = LP_BACKEND
+        if backend not in LP_SOLVERS:
+            raise ValueError(f"Unknown LP backend {backend}! Choose from {list(LP_SOLVERS)}")
+        self.backend = backend
+        self.cons = sparse.csc_matrix(cons, dtype=float)
+        self.b = np.asarray(b, dtype=float).ravel()
+        self.warm_start = backend == 'highs' and highspy is not None
+        self.iterations = []
+        self._model = self.__build_model() if self.warm_start else None
+        return
+
+    def __build_model(self):
+        '''
+        Passes the constraints to a HiGHS model with zero costs.
+        '''
+        n_rows, n_cols = self.cons.shape
+        lp = highspy.HighsLp()
+        lp.num_col_ = n_cols
+        lp.num_row_ = n_rows
+        lp.col_cost_ = np.zeros(n_cols)
+        lp.col_lower_ = np.zeros(n_cols)
+        lp.col_upper_ = np.full(n_cols, highspy.kHighsInf)
+        lp.row_lower_ = self.b
+        lp.row_upper_ = self.b
+        lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+        lp.a_matrix_.start_ = self.cons.indptr
+        lp.a_matrix_.index_ = self.cons.indices
+        lp.a_matrix_.value_ = self.cons.data
+        model = highspy.Highs()
+        model.setOptionValue('output_flag', False)
+        model.passModel(lp)
+        return model
+
+    def solve(self, c):
+        '''
+        Solves the linear program for the cost vector c.
+        :param float c: a vector of cost coefficients for the objective function.
+        :returns: sol_x, objective_value -- the optimal solution and objective value resp.
+        :rtype: int, float
+        '''
+        if not self.warm_start:
+            self.iterations.append(None)
+            return lp_solver(c, self.cons, self.b, backend=self.backend)
+
+        # same cost scaling as lp_solver, the basis stays valid under scaling
+        c = np.asarray(c, dtype=float).ravel()
+        scale = np.abs(c).max(initial=0) or 1.0
+        self._model.changeColsCost(len(c), np.arange(len(c), dtype=np.int32), c / scale)
+        self._model.run()
+        if self._model.getModelStatus() != highspy.HighsModelStatus.kOptimal:
+            raise ValueError(f"HiGHS failed to solve the linear program: "
+                             f"{self._model.modelStatusToString(self._model.getModelStatus())}")
+        info = self._model.getInfo()
+        self.iterations.append(info.simplex_iteration_count)
+        sol_x = np.array(self._model.getSolution().col_value).reshape(-1, 1)
+        return sol_x, info.objective_function_value * scale
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:10:26 2026
+
+Author: Rounak Meyur
+
+Description: Binary store of the line segments of the actual and synthetic
+networks of an area. Every network is kept as an array of unique vertex
+coordinates, an array of segments indexing the vertices and arrays of segment
+attributes, in .npy files which are memory mapped when the store is loaded.
+The store also keeps the hull of the area and the size and modification time
+of the source files it was built from, so that a stale store is detected.
+"""
+
+import os
+import json
+import shutil
+
+import numpy as np
+import shapely
+
+from libs.pyGeometrylib import get_vertex_index
+
+
+# 2: synthetic segments in the edge order of the graph
+STORE_VERSION = 2
+
+def geometry_to_structure(geometry):
+    '''
+    Vertices and segments of a list of two point line geometries. The vertices
+    are the exact coordinates in order of first appearance.
+    :returns: vertices, segments -- arrays of dimension (nx2) and (mx2).
+    '''
+    if len(geometry) == 0:
+        return np.empty((0, 2)), np.empty((0, 2), dtype=np.int64)
+    if np.any(shapely.get_num_coordinates(geometry) != 2):
+        raise ValueError("The network store only holds two point line segments!")
+    vertices, index = get_vertex_index(shapely.get_coordinates(geometry))
+    return vertices, index.reshape(-1, 2).astype(np.int64)
+
+def structure_to_geometry(vertices, segments):
+    '''
+    Rebuilds the list of LineStrings of the segments.
+    '''
+    if len(segments) == 0:
+        return []
+    return list(shapely.linestrings(np.asarray(vertices)[np.asarray(segments)]))
+
+def file_signature(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+def write_network_store(store_dir, networks, hull, sources=(), **meta):
+    '''
+    Writes the networks of an area to a store directory, replacing an earlier
+    store. The files are written to a temporary directory first, so that an
+    interrupted conversion never leaves a partial store.
+    :param str store_dir: directory of the store.
+    :param dict networks: list of line geometries keyed by the network name,
+        or a tuple of the list and a dictionary of segment attribute arrays.
+    :param hull: polygon of the area.
+    :param sources: paths of the files the networks were read from.
+    :param meta: other values recorded in the manifest, such as the area.
+    '''
+    temp_dir = f"{store_dir}.tmp"
+    if os.path.isdir(temp_dir):
+        shutil.rmtree(temp_dir)
+    os.makedirs(temp_dir)
+
+    manifest = {'version': STORE_VERSION, 'networks': {}, **meta}
+    for name, network in networks.items():
+        geometry, attributes = network if isinstance(network, tuple) else (network, {})
+        vertices, segments = geometry_to_structure(geometry)
+        np.save(f"{temp_dir}/{name}_vertices.npy", vertices)
+        np.save(f"{temp_dir}/{name}_segments.npy", segments)
+        for attr, values in attributes.items():
+            values = np.asarray(values)
+            if len(values) != len(segments):
+                raise ValueError(f"Attribute {attr} of {name} has {len(values)} values "
+                                 f"for {len(segments)} segments!")
+            if values.dtype == object:
+                values = values.astype(str)
+            np.save(f"{temp_dir}/{name}_{attr}.npy", values)
+        manifest['networks'][name] = {
+            'vertices': len(vertices), 'segments': len(segments),
+            'attributes': list(attributes)}
+
+    np.save(f"{temp_dir}/hull.npy", np.frombuffer(shapely.to_wkb(hull), dtype=np.uint8))
+    manifest['sources'] = {path: file_signature(path) for path in sources}
+    with open(f"{temp_dir}/manifest.json", 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    if os.path.isdir(store_dir):
+        shutil.rmtree(store_dir)
+    os.replace(temp_dir, store_dir)
+    return
+
+def read_store_manifest(store_dir):
+    path = f"{store_dir}/manifest.json"
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def is_store_current(store_dir):
+    '''
+    Whether a store exists in the current format and none of its source
+    files was changed since it was written. Sources which are not present
+    are not checked, the store is then the only copy of the network.
+    '''
+    manifest = read_store_manifest(store_dir)
+    if not manifest or manifest.get('version') != STORE_VERSION:
+        return False
+    return all(file_signature(path) == signature
+               for path, signature in manifest['sources'].items()
+               if os.path.exists(path))
+
+def read_network_store(store_dir, mmap=True):
+    '''
+    Loads a store written by write_network_store.
+    :param bool mmap: memory map the arrays instead of reading them.
+    :returns: dictionary keyed by the network names of dictionaries with the
+        'vertices', 'segments' and 'attributes' arrays, with the 'hull' and
+        the 'manifest' of the store.
+    '''
+    manifest = read_store_manifest(store_dir)
+    if not manifest:
+        raise ValueError(f"{store_dir} is not a network store!")
+    mode = 'r' if mmap else None
+    store = {'manifest': manifest}
+    for name, network in manifest['networks'].items():
+        store[name] = {
+            'vertices': np.load(f"{store_dir}/{name}_vertices.npy", mmap_mode=mode),
+            'segments': np.load(f"{store_dir}/{name}_segments.npy", mmap_mode=mode),
+            'attributes': {
+                attr: np.load(f"{store_dir}/{name}_{attr}.npy", mmap_mode=mode)
+                for attr in network['attributes']},
+            }
+    store['hull'] = shapely.from_wkb(np.load(f"{store_dir}/hull.npy").tobytes())
+    return store
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:12:37 2026
+
+Author: Rounak Meyur
+
+Description: Ensembles of randomly perturbed variants of a network for the
+stability studies. All the variants share the vertex and segment structure of
+the network and differ only in the vertex coordinates. The coordinates of a
+variant are generated when needed from its own seed, so that any variant is
+the same in every process and in every order of evaluation, or are read from
+a (N,V,2) memory mapped array. Line geometries are only created for the few
+segments of a variant near a region.
+"""
+
+import os
+import numpy as np
+import shapely
+from shapely import STRtree
+
+from libs.pyGeometrylib import get_structure
+
+
+EARTH_RADIUS = 6378100
+
+def radius_to_degrees(radius):
+    '''
+    Deviation in degrees for a deviation radius in meters.
+    '''
+    return (180/np.pi) * (radius/EARTH_RADIUS)
+
+
+class PerturbationEnsemble:
+    """
+    Variants of a network with randomly displaced vertices. The i-th variant
+    displaces num_perturbed vertices chosen among the candidates, all the
+    vertices by default, in a random direction by upto radius meters.
+    """
+    def __init__(self, geometry, num_variants, radius=10, num_perturbed=None,
+                 candidates=None, uniform=True, seed=None):
+        '''
+        :param geometry: list of line segments of the network.
+        :param int num_variants: number of variants N.
+        :param float radius: largest displacement of a vertex in meters.
+        :param num_perturbed: number of vertices displaced in every variant,
+            None displaces all the candidates.
+        :param candidates: indices of the vertices which may be displaced, by
+            default all the vertices.
+        :param bool uniform: displacements uniform in the disk of the radius,
+            else all of the radius.
+        :param seed: seed of the ensemble, the variants are drawn from its
+            children.
+        '''
+        struct = get_structure(geometry)
+        self.vertices_base = np.asarray(struct['vertices'], dtype=float).reshape(-1, 2)
+        self.segments = np.asarray(struct['segments'], dtype=np.int64).reshape(-1, 2)
+        self.radius = radius
+        self.num_perturbed = num_perturbed
+        self.candidates = np.arange(len(self.vertices_base)) if candidates is None \
+            else np.asarray(candidates, dtype=int)
+        if num_perturbed is not None and num_perturbed > len(self.candidates):
+            raise ValueError(f"Cannot perturb {num_perturbed} of {len(self.candidates)} vertices!")
+        self.uniform = uniform
+        self.seeds = np.random.SeedSequence(seed).spawn(num_variants)
+        self.mmap_path = None
+        self._mmap = None
+        self._tree = None
+        return
+
+    def __len__(self):
+        return len(self.seeds)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.vertices(i)
+
+    def __getstate__(self):
+        # the tree is rebuilt and the memory map reopened by the workers
+        state = self.__dict__.copy()
+        state['_mmap'] = None
+        state['_tree'] = None
+        return state
+
+    def vertices(self, i):
+        '''
+        Vertex coordinates of the i-th variant.
+        :returns: array of dimension (Vx2).
+        '''
+        if self.mmap_path is not None:
+            if self._mmap is None:
+                self._mmap = np.load(self.mmap_path, mmap_mode='r')
+            return np.asarray(self._mmap[i])
+
+        rng = np.random.default_rng(self.seeds[i])
+        if self.num_perturbed is None:
+            index = self.candidates
+        else:
+            index = rng.choice(self.candidates, size=self.num_perturbed, replace=False)
+        phi = radius_to_degrees(self.radius)
+        r = phi * np.sqrt(rng.uniform(size=len(index))) if self.uniform \
+            else np.full(len(index), phi)
+        theta = rng.uniform(size=len(index)) * 2 * np.pi
+        vertices = self.vertices_base.copy()
+        vertices[index] += np.column_stack((r * np.cos(theta), r * np.sin(theta)))
+        return vertices
+
+    def to_memmap(self, path):
+        '''
+        Writes the vertices of all the variants to an .npy file of dimension
+        (NxVx2), from which the variants are read afterwards.
+        '''
+        self.mmap_path, self._mmap = None, None
+        temp_path = f"{path}.tmp.npy"
+        out = np.lib.format.open_memmap(
+            temp_path, mode='w+', dtype=float, shape=(len(self),) + self.vertices_base.shape)
+        for i in range(len(self)):
+            out[i] = self.vertices(i)
+        out.flush()
+        del out
+        os.replace(temp_path, path)
+        self.mmap_path = path
+        return path
+
+    def get_tree(self):
+        if self._tree is None:
+            self._tree = STRtree(shapely.linestrings(self.vertices_base[self.segments]))
+        return self._tree
+
+    def region_segments(self, region):
+        '''
+        Indices of the segments which may intersect the region in a variant,
+        those whose unperturbed geometry is within the radius of the region.
+        '''
+        reach = region.buffer(radius_to_degrees(self.radius) * (1 + 1e-6))
+        return np.sort(self.get_tree().query(reach, predicate='intersects'))
+
+    def segment_coords(self, i, index=None):
+        '''
+        End points of the segments of the i-th variant.
+        :returns: array of dimension (mx2x2).
+        '''
+        segments = self.segments if index is None else self.segments[index]
+        return self.vertices(i)[segments]
+
+    def clip(self, i, region, index=None):
+        '''
+        Line segments of the i-th variant intersecting the region, in network
+        order, as clip_geometry of the fixture returns them.
+        :param index: segments which may intersect the region, see
+            region_segments.
+        '''
+        if index is None:
+            index = self.region_segments(region)
+        if len(index) == 0:
+            return []
+        lines = shapely.linestrings(self.segment_coords(i, index))
+        return list(lines[shapely.intersects(lines, region)])
+
+    def geometry(self, i):
+        '''
+        All the line segments of the i-th variant.
+        '''
+        return list(shapely.linestrings(self.segment_coords(i)))
@@ -0,0 +1,373 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 19:48:09 2026
+
+Author: Rounak Meyur
+
+Description: Streaming sink for the result tables of long statistics runs.
+Rows are appended to a CSV file, or written as parts of a Parquet dataset, as
+soon as they are computed, next to a manifest recording the parameters and the
+progress of the run. A restarted run opens the same sink, which reads the keys
+of the rows already written so that the completed work can be skipped.
+Parquet datasets can be partitioned by columns such as area, epsilon and
+lambda, and read_results loads CSV files and Parquet datasets with the same
+column projection and row filters, which for Parquet only read the matching
+partitions and row groups.
+"""
+
+import os
+import json
+import glob
+import shutil
+from datetime import datetime
+
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:
+    pyarrow = None
+
+
+FILTER_OPERATORS = {
+    '==': lambda col, val: col == val,
+    '=': lambda col, val: col == val,
+    '!=': lambda col, val: col != val,
+    '<': lambda col, val: col < val,
+    '<=': lambda col, val: col <= val,
+    '>': lambda col, val: col > val,
+    '>=': lambda col, val: col >= val,
+    'in': lambda col, val: col.isin(val),
+    'not in': lambda col, val: ~col.isin(val),
+    }
+
+def filter_conjunctions(filters):
+    '''
+    Filters in the format of pandas.read_parquet, a list of (column,
+    operator, value) tuples which must all hold or a list of such lists of
+    which one must hold, as a list of lists.
+    '''
+    if not filters:
+        return []
+    return filters if isinstance(filters[0], list) else [filters]
+
+def apply_filters(df, filters):
+    '''
+    Rows of a DataFrame passing the filters.
+    '''
+    if not filters:
+        return df
+    keep = pd.Series(False, index=df.index)
+    for conjunction in filter_conjunctions(filters):
+        mask = pd.Series(True, index=df.index)
+        for col, op, val in conjunction:
+            if op not in FILTER_OPERATORS:
+                raise ValueError(f"Unknown filter operator {op}! Choose from {list(FILTER_OPERATORS)}")
+            mask &= FILTER_OPERATORS[op](df[col], val)
+        keep |= mask
+    return df[keep]
+
+def read_results(path, columns=None, filters=None, dtype=None):
+    '''
+    Reads a result table from a CSV file or a Parquet file or dataset.
+    :param str path: .csv file, or .parquet file or dataset directory.
+    :param columns: columns to load, all by default.
+    :param filters: row filters, see apply_filters. For Parquet they are
+        pushed down to skip partitions and row groups.
+    :param dict dtype: types of the columns, applied to the loaded columns.
+    :returns: DataFrame
+    '''
+    if path.endswith('.csv'):
+        usecols = None
+        if columns is not None:
+            # the filtered columns are needed to apply the filters
+            needed = set(columns) | {f[0] for conj in filter_conjunctions(filters) for f in conj}
+            usecols = lambda col: col in needed
+        df = pd.read_csv(path, sep=",", usecols=usecols, dtype=dtype)
+        df = apply_filters(df, filters)
+        if columns is not None:
+            df = df[list(columns)]
+        df = df.reset_index(drop=True)
+    else:
+        if pyarrow is None:
+            raise ValueError("Parquet results need pyarrow, install it or use a csv file")
+        df = pd.read_parquet(path, columns=list(columns) if columns is not None else None,
+                             filters=filters or None)
+        # partition columns are read as categories of their directory names
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype(df[col].cat.categories.dtype)
+    if dtype:
+        df = df.astype({col: typ for col, typ in dtype.items() if col in df.columns})
+    return df
+
+def write_results(df, path, partition_cols=None):
+    '''
+    Writes a result table as a Parquet dataset, replacing an earlier one.
+    :param str path: directory of the dataset.
+    :param partition_cols: columns of the directories of the dataset.
+    '''
+    if pyarrow is None:
+        raise ValueError("Parquet results need pyarrow, install it or use a csv file")
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    table = pyarrow.Table.from_pandas(numeric_columns(df), preserve_index=False)
+    pq.write_to_dataset(table, path, partition_cols=partition_cols or None,
+                        basename_template="part-00000-{i}.parquet")
+    return
+
+def numeric_columns(df):
+    '''
+    Object columns of numbers and missing values as floats, so that every
+    part of a Parquet dataset has the same schema.
+    '''
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == object:
+            try:
+                df[col] = pd.to_numeric(df[col])
+            except (ValueError, TypeError):
+                pass
+    return df
+
+def normalize_key(value):
+    '''
+    Key value independent of its type: numbers, numeric strings and their
+    values read back from a file compare equal.
+    '''
+    try:
+        return repr(float(value))
+    except (TypeError, ValueError):
+        return str(value)
+
+
+class ResultSink:
+    """
+    Appends result rows to a CSV file or a Parquet dataset directory and keeps
+    a JSON manifest of the run.
+    """
+    def __init__(self, path, key_columns, columns=None, params=None, resume=True,
+                 file_format=None, partition_cols=None, batch_rows=1, **kwargs):
+        '''
+        :param str path: CSV file, or directory of the Parquet dataset.
+        :param key_columns: columns identifying a completed row, such as
+            ('area', 'epsilons', 'lambdas', 'region').
+        :param columns: columns written in this order, by default all
+            columns of the first rows.
+        :param dict params: parameters of the run recorded in the manifest.
+            A run is only resumed with the parameters it was started with.
+        :param bool resume: keep the rows of an earlier run with the same
+            parameters, otherwise start a new run.
+        :param str file_format: 'csv' or 'parquet', by default from the
+            extension of the path.
+        :param partition_cols: columns of the directories of a Parquet
+            dataset, such as ['area', 'epsilons', 'lambdas'].
+        :param int batch_rows: rows buffered before they are written.
+        :param kwargs: options of DataFrame.to_csv, such as quoting.
+        '''
+        if not file_format:
+            file_format = 'parquet' if path.endswith('.parquet') else 'csv'
+        if file_format not in ('csv', 'parquet'):
+            raise ValueError(f"Unknown result format {file_format}! Choose from ['csv', 'parquet']")
+        if file_format == 'parquet' and pyarrow is None:
+            raise ValueError("Parquet results need pyarrow, install it or use a csv file")
+        if partition_cols and file_format != 'parquet':
+            raise ValueError("Only Parquet results can be partitioned")
+
+        self.path = path
+        self.file_format = file_format
+        self.key_columns = list(key_columns)
+        self.partition_cols = list(partition_cols or [])
+        self.params = params or {}
+        self.batch_rows = batch_rows
+        self.csv_options = kwargs
+        self.columns = list(columns) if columns is not None else None
+        self._buffer = []
+        self._parts = 0
+        self.completed = set()
+
+        if file_format == 'csv':
+            self.manifest_path = f"{os.path.splitext(path)[0]}.manifest.json"
+        else:
+            self.manifest_path = os.path.join(path, "_manifest.json")
+
+        manifest = self.read_manifest()
+        if resume and manifest and manifest['params'] != json.loads(json.dumps(self.params)):
+            raise ValueError(f"Cannot resume {path}, it was started with other parameters "
+                             f"{manifest['params']}")
+        if resume and manifest:
+            self.manifest = manifest
+            self._resume()
+        else:
+            self._discard()
+            self.manifest = {
+                'path': path, 'format': file_format, 'key_columns': self.key_columns,
+                'partition_cols': self.partition_cols,
+                'params': self.params, 'columns': None, 'rows': 0,
+                'started': datetime.now().isoformat(timespec='seconds'),
+                'updated': None, 'status': 'running'}
+        self.manifest['status'] = 'running'
+        self.write_manifest()
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(complete=exc_type is None)
+        return False
+
+    def __len__(self):
+        return len(self.completed)
+
+    def key(self, row):
+        return tuple(normalize_key(row[col]) for col in self.key_columns)
+
+    def is_done(self, row):
+        '''
+        Whether the row with the key values of a mapping has been written.
+        '''
+        return self.key(row) in self.completed
+
+    def read_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return None
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def write_manifest(self):
+        self.manifest['updated'] = datetime.now().isoformat(timespec='seconds')
+        self.manifest['columns'] = self.columns
+        self.manifest['completed'] = len(self.completed)
+        directory = os.path.dirname(self.manifest_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp = f"{self.manifest_path}.tmp"
+        with open(temp, 'w') as f:
+            json.dump(self.manifest, f, indent=2, default=str)
+        os.replace(temp, self.manifest_path)
+        return
+
+    def _discard(self):
+        if self.file_format == 'csv':
+            if os.path.exists(self.path):
+                os.remove(self.path)
+        else:
+            for part in self.parts():
+                os.remove(part)
+        return
+
+    def parts(self):
+        '''
+        Files of a Parquet dataset, in the order they were written.
+        '''
+        parts = glob.glob(os.path.join(self.path, "**", "part-*.parquet"), recursive=True)
+        return sorted(parts, key=os.path.basename)
+
+    def _resume(self):
+        self.columns = self.manifest.get('columns') or self.columns
+        if self.file_format == 'csv':
+            if not os.path.exists(self.path):
+                return
+            # drop a row cut short by a crash
+            with open(self.path, 'rb+') as f:
+                data = f.read()
+                end = data.rfind(b'\n') + 1
+                if end < len(data):
+                    f.truncate(end)
+            if end == 0:
+                return
+            keys = pd.read_csv(self.path, usecols=self.key_columns, dtype=str)
+        else:
+            parts = self.parts()
+            if not parts:
+                return
+            self._parts = 1 + max(int(os.path.basename(part).split('-')[1].split('.')[0])
+                                  for part in parts)
+            keys = read_results(self.path, columns=self.key_columns)
+        self.completed.update(
+            tuple(normalize_key(value) for value in row)
+            for row in keys[self.key_columns].itertuples(index=False))
+        self.manifest['rows'] = len(keys)
+        return
+
+    def write(self, rows):
+        '''
+        Adds rows to the sink, written once batch_rows rows are buffered.
+        :param rows: DataFrame or dictionary of columns.
+        '''
+        frame = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(rows)
+        missing = [col for col in self.key_columns if col not in frame.columns]
+        if missing:
+            raise ValueError(f"Result rows are missing the key columns {missing}")
+        if self.columns is None:
+            self.columns = list(frame.columns)
+        self._buffer.append(frame[self.columns])
+        if sum(len(f) for f in self._buffer) >= self.batch_rows:
+            self.flush()
+        return
+
+    def flush(self):
+        '''
+        Writes the buffered rows and updates the manifest.
+        '''
+        if not self._buffer:
+            return
+        frame = pd.concat(self._buffer, ignore_index=True)
+        self._buffer = []
+        if self.file_format == 'csv':
+            header = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'a') as f:
+                frame.to_csv(f, index=False, header=header, **self.csv_options)
+                f.flush()
+                os.fsync(f.fileno())
+        else:
+            os.makedirs(self.path, exist_ok=True)
+            table = pyarrow.Table.from_pandas(numeric_columns(frame), preserve_index=False)
+            if self.partition_cols:
+                pq.write_to_dataset(
+                    table, self.path, partition_cols=self.partition_cols,
+                    basename_template=f"part-{self._parts:05d}-{{i}}.parquet",
+                    existing_data_behavior='overwrite_or_ignore')
+            else:
+                # hidden while written, so that readers never see a partial file
+                part = os.path.join(self.path, f"part-{self._parts:05d}.parquet")
+                temp = os.path.join(self.path, f".part-{self._parts:05d}.parquet.tmp")
+                pq.write_table(table, temp)
+                os.replace(temp, part)
+            self._parts += 1
+
+        self.completed.update(
+            tuple(normalize_key(value) for value in row)
+            for row in frame[self.key_columns].itertuples(index=False))
+        self.manifest['rows'] += len(frame)
+        self.write_manifest()
+        return
+
+    def close(self, complete=True):
+        '''
+        Writes the remaining rows, and marks the run complete in the manifest.
+        '''
+        self.flush()
+        if complete:
+            self.manifest['status'] = 'complete'
+        self.write_manifest()
+        return
+
+    def read(self, columns=None, filters=None):
+        '''
+        Rows written to the sink by this and the earlier runs.
+        :param columns, filters: see read_results.
+        '''
+        self.flush()
+        if (self.file_format == 'csv' and not os.path.exists(self.path)) \
+                or (self.file_format == 'parquet' and not self.parts()):
+            return pd.DataFrame(columns=columns or self.columns)
+        df = read_results(self.path, columns=columns, filters=filters)
+        if columns is None and self.columns:
+            df = df[[col for col in self.columns if col in df.columns]]
+        return df
@@ -12,7 +12,7 @@ import numpy as np
 
 from scipy.linalg import det
 from scipy.special import factorial
-from scipy.sparse import dok_matrix
+from scipy.sparse import dok_matrix, coo_matrix
 
 
 def get_subsimplices(simplices):
@@ -99,10 +99,90 @@ def simpvol(points, simplices, k=1):
         volume = volume/factorial(points.shape[1])
     return volume
 
+def simplex_keys(simplices, base):
+    '''
+    Encodes each row of sorted vertex indices as a single integer key in the
+    given base. Returns None if the keys do not fit in 64 bit integers.
+    '''
+    if simplices.shape[1] * np.log2(max(base, 2)) >= 63:
+        return None
+    keys = np.zeros(simplices.shape[0], dtype=np.int64)
+    for j in range(simplices.shape[1]):
+        keys = keys * base + simplices[:, j]
+    return keys
+
+def find_subsimplices(faces, subsimplices):
+    '''
+    Returns the row index in subsimplices of every face, or -1 if the face is not present.
+    Both arrays must have their vertex indices sorted along the rows.
+    '''
+    base = np.int64(max(faces.max(initial=0), subsimplices.max(initial=0))) + 1
+    face_keys = simplex_keys(faces, base)
+    if face_keys is not None:
+        sub_keys = simplex_keys(subsimplices, base)
+    else:
+        # too many vertices for integer keys: rank the rows instead
+        _, inverse = np.unique(np.vstack((subsimplices, faces)), axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        sub_keys, face_keys = inverse[:len(subsimplices)], inverse[len(subsimplices):]
+    if len(sub_keys) == 0:
+        return np.full(len(face_keys), -1)
+    sort_idx = np.argsort(sub_keys, kind='stable')
+    pos = np.searchsorted(sub_keys[sort_idx], face_keys)
+    face_idx = sort_idx[np.minimum(pos, len(sub_keys) - 1)]
+    face_idx[sub_keys[face_idx] != face_keys] = -1
+    return face_idx
+
 def boundary_matrix(simplices, subsimplices, is_oriented=True, is_sparse=True, format='coo'):
     '''
     Builds a boundary matrix of given simplices. The format of a boundary matrix is as follows.
     boundary_matrix = (number of subsimplices) x (number of simplices)
+    The faces of all simplices are located in bulk through integer keys, so the
+    matrix is assembled in O((n+m) log m) instead of one search per face.
+    '''
+    simplices = np.asarray(simplices)
+    subsimplices = np.asarray(subsimplices)
+    simplex_dim = simplices.shape[1]
+    n_simplices = simplices.shape[0]
+    m_subsimplices = subsimplices.shape[0]
+
+    sorted_simplices = np.sort(simplices, axis=1)
+    sorted_subsimplices = np.sort(subsimplices, axis=1)
+
+    # j-th face of every sorted simplex, stacked face by face
+    faces = []
+    for j in range(simplex_dim):
+        idx = list(range(simplex_dim))
+        idx.pop(j)
+        faces.append(sorted_simplices.take(idx, axis=1))
+    rows = find_subsimplices(np.vstack(faces), sorted_subsimplices)
+    cols = np.tile(np.arange(n_simplices), simplex_dim)
+    if (rows < 0).any():
+        sys.stderr.write("Unable to find subsimplex! Make sure subsimplices contains all boundary subsimplices\n")
+        exit()
+
+    if is_oriented:
+        simplices_parity = permutationparity(np.argsort(simplices), 2)
+        subsimplices_parity = permutationparity(np.argsort(subsimplices), 2)
+        face_j = np.repeat(np.arange(simplex_dim), n_simplices)
+        vals = (-1)**((face_j + 1 + 1 + simplices_parity[cols] + subsimplices_parity[rows]) % 2)
+    else:
+        vals = np.ones(len(rows), dtype=np.int8)
+    vals = vals.astype(np.int8)
+
+    if is_sparse:
+        boundary_matrix = coo_matrix((vals, (rows, cols)), shape=(m_subsimplices, n_simplices))
+        return boundary_matrix.asformat(format)
+    else:
+        boundary_matrix = np.zeros((m_subsimplices, n_simplices), dtype=np.int8)
+        boundary_matrix[rows, cols] = vals
+        return boundary_matrix
+
+def boundary_matrix_dok(simplices, subsimplices, is_oriented=True, is_sparse=True, format='coo'):
+    '''
+    Builds a boundary matrix of given simplices one entry at a time. The format of a boundary matrix is as follows.
+    boundary_matrix = (number of subsimplices) x (number of simplices)
+    Reference implementation of boundary_matrix, kept for benchmarking.
     '''
     simplex_dim  = simplices.shape[1] 
     n_simplices = simplices.shape[0]
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:36:02 2026
+
+Author: Rounak Meyur
+
+Description: Converts the actual and synthetic networks of the areas to the
+binary network store, which read_networks loads by memory mapping instead of
+reading the shapefiles and gpickles. Run once, and again after the input
+networks change. The areas can be given on the command line, all areas are
+converted by default.
+"""
+
+import sys, os
+from timeit import default_timer as timer
+from datetime import timedelta
+
+workpath = os.getcwd()
+sys.path.append(workpath+'/libs/')
+
+from libs.pyFlatNormFixture import FlatNormFixture
+
+
+if __name__ == '__main__':
+    fx = FlatNormFixture('runTest')
+    areas = sys.argv[1:] or list(fx.area_codes)
+
+    for area in areas:
+        start = timer()
+        store_dir = fx.write_network_store(area)
+        end = timer()
+
+        start_read = timer()
+        act_geom, synt_geom, hull = fx.read_network_store(area)
+        end_read = timer()
+        print(f"{area} : {len(act_geom)} actual and {len(synt_geom)} synthetic segments "
+              f"-> {store_dir} : convert {timedelta(seconds=end - start)} : "
+              f"load {timedelta(seconds=end_read - start_read)}")
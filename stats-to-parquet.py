@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 20:41:57 2026
+
+Author: Rounak Meyur
+
+Description: Converts the CSV flat norm statistics of the areas to Parquet
+datasets partitioned by area, epsilon and lambda. The readers of the fixture
+use a Parquet dataset in place of the CSV file of the same name, and load only
+the partitions of the lambdas a plotting script renders.
+"""
+
+import sys, os
+import glob
+import pandas as pd
+
+workpath = os.getcwd()
+sys.path.append(workpath+'/libs/')
+
+from libs.pyResultSinklib import write_results
+
+
+if __name__ == '__main__':
+    in_dir = "out/test"
+    areas = ['mcbryde', 'patrick_henry', 'hethwood', 'north_blacksburg']
+
+    for area in areas:
+        for csv_file in sorted(glob.glob(f"{in_dir}/{area}-FN_STAT_R*.csv")):
+            df = pd.read_csv(csv_file, sep=",")
+            if 'area' not in df.columns:
+                df.insert(0, 'area', area)
+            parquet_file = f"{os.path.splitext(csv_file)[0]}.parquet"
+            write_results(df, parquet_file, partition_cols=['area', 'epsilons', 'lambdas'])
+            print(f"{csv_file} : {len(df)} rows -> {parquet_file}")